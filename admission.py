@@ -0,0 +1,106 @@
+"""Admission control for calls to a shared backend (Ollama).
+
+At most `max_concurrent` calls run at once. Further callers wait in a
+priority queue (lower number first, FIFO within a priority) and are handed
+a slot as soon as one frees up. When `max_queue` callers are already
+waiting, new ones are turned away immediately with `Overloaded`, which
+carries a Retry-After estimate, instead of piling up behind the backend
+until they time out.
+
+    with controller.slot("chat"):
+        ...call the backend...
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class Overloaded(Exception):
+    """The queue is full (or the wait timed out); retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounded concurrency with a bounded priority queue and wait metrics"""
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 16, queue_timeout: float = 30.0,
+                 priorities: Optional[Dict[str, int]] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priorities = priorities or {"translate": 0, "chat": 1}
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiters = []  # heap of [priority, seq, event, admitted]
+        self._seq = itertools.count()
+        self._service_time = 1.0  # EWMA of seconds a slot is held, for Retry-After
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timeouts": 0,
+                         "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+    def _retry_after(self) -> int:
+        backlog = len(self._waiters) + self._running
+        return max(1, round(self._service_time * backlog / max(1, self.max_concurrent)))
+
+    def _acquire(self, kind: str):
+        priority = self.priorities.get(kind, max(self.priorities.values(), default=0) + 1)
+        with self._lock:
+            if self._running < self.max_concurrent and not self._waiters:
+                self._running += 1
+                self.counters["admitted"] += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise Overloaded("Ollama queue is full", self._retry_after())
+            waiter = [priority, next(self._seq), threading.Event(), False]
+            heapq.heappush(self._waiters, waiter)
+            self.counters["queued"] += 1
+        started = time.monotonic()
+        waiter[2].wait(self.queue_timeout)
+        waited = time.monotonic() - started
+        with self._lock:
+            if not waiter[3]:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self.counters["timeouts"] += 1
+                raise Overloaded("Timed out waiting for Ollama", self._retry_after())
+            self.counters["admitted"] += 1
+            self.counters["wait_seconds_total"] += waited
+            self.counters["wait_seconds_max"] = max(self.counters["wait_seconds_max"], waited)
+        return waited
+
+    def _release(self, held: float):
+        with self._lock:
+            self._service_time = 0.8 * self._service_time + 0.2 * held
+            if self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                waiter[3] = True  # hand the slot straight over
+                waiter[2].set()
+            else:
+                self._running -= 1
+
+    @contextmanager
+    def slot(self, kind: str = "chat"):
+        """Hold one backend slot for the duration of the block; raises Overloaded"""
+        self._acquire(kind)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            admitted_after_wait = self.counters["queued"] - self.counters["timeouts"] - len(self._waiters)
+            return {
+                "in_flight": self._running,
+                "queue_depth": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                **self.counters,
+                "wait_seconds_avg": round(self.counters["wait_seconds_total"] / admitted_after_wait, 4)
+                if admitted_after_wait > 0 else 0.0,
+            }
@@ -1,13 +1,27 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 import requests
 import os
+import json
 from dotenv import load_dotenv
 from spaced_repetition import SpacedRepetition
+from storage import CARD_FIELDS, open_storage
+from deck_manager import DeckManager, deck_path, valid_id
+from importer import FORMATS as IMPORT_FORMATS, detect_format, iter_rows, text_stream
+from resilience import CircuitBreaker, SingleFlight, guarded, hedged
+from translation_cache import MISS, TranslationCache, cache_key
+from session_store import open_session_store
+from morphology import KnownWordMatcher
+from admission import AdmissionController, Overloaded
+from ollama_pool import OllamaPool, load_hosts
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from profiling import RequestProfiler
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import hmac
+import random
 import re
-from functools import lru_cache
-from collections import defaultdict
 import time
 import threading
 
@@ -35,12 +49,59 @@ SESSION = requests.Session()
 DEFAULT_TIMEOUT = (5, 90)  # (connect, read)
 
 # Spaced Repetition system
-sr_system = SpacedRepetition()
+# SR_STORAGE: "json" (default, vocabulary.json), "sqlite" (vocabulary.db, one row per card)
+# or "journal" (vocabulary.json snapshot + append-only vocabulary.json.journal)
+SR_STORAGE = os.getenv('SR_STORAGE', 'json')
+SR_STORAGE_OPTIONS = {}
+if SR_STORAGE == 'journal':
+    SR_STORAGE_OPTIONS = {
+        'fsync': os.getenv('SR_JOURNAL_FSYNC', 'interval'),  # always | interval | never
+        'compact_every': int(os.getenv('SR_JOURNAL_COMPACT_EVERY', '1000')),
+    }
+sr_system = SpacedRepetition(storage=open_storage(SR_STORAGE, os.getenv('SR_DATA_FILE'), **SR_STORAGE_OPTIONS))
+
+# Per-user decks: a request naming a user (X-User-Id header or ?user=) gets that user's deck
+# (X-Deck-Id or ?deck=, default "default") from SR_DECKS_DIR/<user>/<deck>.json (.db for sqlite);
+# requests without one get the deck above. Decks load on first use; idle ones are flushed and
+# unloaded after SR_DECK_IDLE_TTL seconds, or least recently used first once more than
+# SR_MAX_RESIDENT_DECKS decks or SR_MAX_RESIDENT_CARDS cards are in memory.
+# The user id is trusted as sent: run behind a proxy that authenticates users and sets it.
+SR_DECKS_DIR = os.getenv('SR_DECKS_DIR', 'decks')
+
+def open_deck(user_id: str, deck_id: str) -> SpacedRepetition:
+    path = deck_path(SR_DECKS_DIR, user_id, deck_id, SR_STORAGE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    deck = SpacedRepetition(storage=open_storage(SR_STORAGE, path, **SR_STORAGE_OPTIONS))
+    deck.storage.observer = observe_storage_write
+    return deck
+
+DECKS = DeckManager(
+    open_deck,
+    max_decks=int(os.getenv('SR_MAX_RESIDENT_DECKS', '64')),
+    max_cards=int(os.getenv('SR_MAX_RESIDENT_CARDS', '500000')),
+    idle_ttl=float(os.getenv('SR_DECK_IDLE_TTL', '900')),
+    default=sr_system,
+)
+
+# Largest accepted POST /api/sr/review/batch
+REVIEW_BATCH_MAX = 1000
+
+# GET /api/sr/words page size cap (?limit=); NDJSON streams are read in chunks of this size
+WORDS_MAX_LIMIT = 1000
+
+# /api/sr/search result cap (?limit=)
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
 
 # Ollama configuration
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 DEFAULT_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2:3b-instruct-q4_K_M')
 
+# Ollama hosts (OLLAMA_HOSTS / OLLAMA_HOSTS_FILE, else OLLAMA_BASE_URL), probed every
+# OLLAMA_PROBE_INTERVAL seconds for health and resident models and kept warm
+OLLAMA_POOL = OllamaPool(load_hosts(OLLAMA_BASE_URL), DEFAULT_MODEL, session=SESSION,
+                         probe_interval=float(os.getenv('OLLAMA_PROBE_INTERVAL', '30')))
+
 # Per-request options for Ollama
 OLLAMA_OPTIONS_CHAT = {
     'num_ctx': 2048,
@@ -50,6 +111,10 @@ OLLAMA_OPTIONS_CHAT = {
     'temperature': 0.7,
     'top_p': 0.9,
 }
+# Strict-mode enforcement: "early" watches the token stream and cancels generation at the
+# first unknown word (then re-prompts once, then truncates); "post" checks finished replies
+STRICT_ENFORCEMENT = os.getenv('STRICT_ENFORCEMENT', 'early')
+
 OLLAMA_OPTIONS_XLATE = {
     'num_ctx': 2048,
     'num_thread': 10,
@@ -57,6 +122,47 @@ OLLAMA_OPTIONS_XLATE = {
     'temperature': 0.0,
 }
 
+# Ollama admission control: OLLAMA_MAX_CONCURRENT calls at once per host, up to OLLAMA_MAX_QUEUE
+# more waiting (OLLAMA_PRIORITY lists kinds highest first); beyond that callers get 429 + Retry-After
+OLLAMA_ADMISSION = AdmissionController(
+    max_concurrent=int(os.getenv('OLLAMA_MAX_CONCURRENT', '2')) * len(OLLAMA_POOL),
+    max_queue=int(os.getenv('OLLAMA_MAX_QUEUE', '16')),
+    queue_timeout=float(os.getenv('OLLAMA_QUEUE_TIMEOUT', '30')),
+    priorities={kind.strip(): rank for rank, kind in enumerate(os.getenv('OLLAMA_PRIORITY', 'translate,chat').split(','))},
+)
+
+# Translation pipeline (/api/sr/ai-translate): Google first, Ollama started as a hedge after
+# TRANSLATE_HEDGE_DELAY seconds (or as soon as Google fails); the first good answer wins
+GOOGLE_TRANSLATE_URL = os.getenv('GOOGLE_TRANSLATE_URL', 'https://translate.googleapis.com/translate_a/single')
+GOOGLE_TIMEOUT = (3, float(os.getenv('GOOGLE_TIMEOUT', '8')))  # (connect, read)
+OLLAMA_XLATE_TIMEOUT = (5, float(os.getenv('OLLAMA_XLATE_TIMEOUT', '30')))
+TRANSLATE_HEDGE_DELAY = float(os.getenv('TRANSLATE_HEDGE_DELAY', '1.5'))
+TRANSLATE_DEADLINE = float(os.getenv('TRANSLATE_DEADLINE', '30'))
+# A provider that fails this many times in a row is skipped for BREAKER_RESET seconds
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '3'))
+BREAKER_RESET = float(os.getenv('BREAKER_RESET', '30'))
+google_breaker = CircuitBreaker('google', BREAKER_FAILURES, BREAKER_RESET)
+ollama_breaker = CircuitBreaker('ollama', BREAKER_FAILURES, BREAKER_RESET)
+TRANSLATE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='translate')
+
+# Translation cache shared by all workers (SQLite file); failures are cached briefly
+TRANSLATION_CACHE = TranslationCache(
+    os.getenv('TRANSLATION_CACHE_PATH', 'translations.db'),
+    ttl=float(os.getenv('TRANSLATION_CACHE_TTL', str(30 * 86400))),
+    negative_ttl=float(os.getenv('TRANSLATION_CACHE_NEGATIVE_TTL', '600')),
+    max_entries=int(os.getenv('TRANSLATION_CACHE_MAX_ENTRIES', '50000')),
+)
+
+# Concurrent identical translation requests share one upstream call. Provider and word are
+# always part of what makes two requests identical; TRANSLATE_COALESCE_KEY=provider,word
+# (without "context") also lets requests for the same word in different sentences share a call
+TRANSLATE_COALESCE_KEY = {f.strip() for f in os.getenv('TRANSLATE_COALESCE_KEY', 'provider,word,context').split(',')
+                          if f.strip()}
+_unknown_coalesce_fields = TRANSLATE_COALESCE_KEY - {'provider', 'word', 'context'}
+if _unknown_coalesce_fields:
+    raise ValueError(f"Unknown TRANSLATE_COALESCE_KEY fields: {', '.join(sorted(_unknown_coalesce_fields))}")
+TRANSLATE_FLIGHT = SingleFlight()
+
 # Compact system prompts (no vocabulary injection)
 STRICT_SYS = (
     "Sei un tutor di italiano. Rispondi SOLO con parole già apprese dallo studente. "
@@ -72,11 +178,41 @@ ITALIAN_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ’']+", re.UNICODE)
 def extract_words(text: str):
     return [w.lower() for w in ITALIAN_WORD_RE.findall(text or "")]
 
-def check_words(text: str, vocab_lower_set: set):
+def check_words(text: str, vocab_lower_set):
+    """Tokens of `text` and those not in `vocab_lower_set` (a set or a KnownWordMatcher)"""
     words = extract_words(text)
     new_words = [w for w in words if w not in vocab_lower_set]
     return words, new_words
 
+class StreamWordChecker:
+    """check_words for a token stream: each word is checked as soon as it is complete"""
+
+    _TRAILING_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ’']+$", re.UNICODE)
+
+    def __init__(self, vocab_lower_set):
+        self.vocab = vocab_lower_set
+        self.words = []
+        self.new_words = []
+        self._tail = ""  # a word that may continue in the next token
+
+    def _check(self, text: str):
+        words, new_words = check_words(text, self.vocab)
+        self.words.extend(words)
+        self.new_words.extend(new_words)
+        return new_words
+
+    def feed(self, delta: str):
+        """Add a token; returns the unknown words it completed"""
+        text = self._tail + (delta or "")
+        m = self._TRAILING_WORD_RE.search(text)
+        self._tail = text[m.start():] if m else ""
+        return self._check(text[:m.start()] if m else text)
+
+    def flush(self):
+        """End of stream; returns the unknown word left in the tail, if any"""
+        text, self._tail = self._tail, ""
+        return self._check(text)
+
 def tidy(s: str) -> str:
     s = (s or "").strip()
     s = re.sub(r"\s+", " ", s)
@@ -84,27 +220,209 @@ def tidy(s: str) -> str:
         s += "."
     return s
 
+# -----------------------------
+# Metrics (GET /metrics, Prometheus text format)
+# -----------------------------
+METRICS = Registry()
+HTTP_SECONDS = METRICS.histogram('http_request_duration_seconds', 'Request latency, until the response body is sent',
+                                 ('route', 'method', 'status'))
+HTTP_IN_FLIGHT = METRICS.gauge('http_requests_in_flight', 'Requests being served', ('route',))
+OLLAMA_SECONDS = METRICS.histogram('ollama_request_duration_seconds', 'Ollama call duration, excluding queueing',
+                                   ('kind',))
+OLLAMA_TOKENS = METRICS.counter('ollama_eval_tokens_total', 'Tokens generated by Ollama', ('kind',))
+OLLAMA_TOKENS_PER_SECOND = METRICS.histogram('ollama_tokens_per_second', 'Generation speed (eval_count / eval_duration)',
+                                             ('kind',), buckets=(1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200))
+CHAT_REGENERATIONS = METRICS.counter('chat_regenerations_total', 'Replies regenerated for breaking the vocabulary rule',
+                                     ('mode',))
+TRANSLATIONS = METRICS.counter('translations_total', 'Translation requests by the provider that answered (none = failed)',
+                               ('endpoint', 'source'))
+STORAGE_SECONDS = METRICS.histogram('sr_storage_write_duration_seconds', 'Deck writes (save_vocabulary is op="save_all")',
+                                    ('op',))
+STORAGE_BYTES = METRICS.counter('sr_storage_written_bytes_total', 'Bytes written by deck writes', ('op',))
+
+def observe_storage_write(op: str, seconds: float, nbytes):
+    STORAGE_SECONDS.observe(seconds, op)
+    if nbytes is not None:
+        STORAGE_BYTES.inc(op, amount=nbytes)
+
+sr_system.storage.observer = observe_storage_write
+
+def translation_cache_lookups():
+    counters = TRANSLATION_CACHE.counters
+    return {(result,): counters[key] for key, result in (('hits', 'hit'), ('negative_hits', 'negative_hit'),
+                                                          ('misses', 'miss'))}
+
+def translation_cache_hit_ratio():
+    counters = TRANSLATION_CACHE.counters
+    lookups = counters['hits'] + counters['negative_hits'] + counters['misses']
+    return (counters['hits'] + counters['negative_hits']) / lookups if lookups else 0.0
+
+# Read at scrape time from state the app keeps anyway
+METRICS.callback('sr_resident_decks', 'Decks loaded in memory, the default one included', lambda: len(DECKS.resident()))
+METRICS.callback('sr_deck_words', 'Cards in resident decks', lambda: sum(len(d.vocabulary) for d in DECKS.resident()))
+METRICS.callback('sr_due_words', 'Cards in resident decks due for review now',
+                 lambda: sum(d.get_stats()['due_words'] for d in DECKS.resident()))
+METRICS.callback('sr_deck_evictions_total', 'Decks unloaded, idle or to stay under the caps',
+                 lambda: {('idle',): DECKS.counters['expired'], ('capacity',): DECKS.counters['evicted']},
+                 type='counter', labelnames=('reason',))
+METRICS.callback('translation_cache_lookups_total', 'Translation cache lookups by result', translation_cache_lookups,
+                 type='counter', labelnames=('result',))
+METRICS.callback('translation_cache_hit_ratio', 'Share of lookups answered from the cache (this process)',
+                 translation_cache_hit_ratio)
+METRICS.callback('translation_breaker_open', 'Whether a provider circuit breaker is skipping calls',
+                 lambda: {(b.name,): int(b.state == 'open') for b in (google_breaker, ollama_breaker)},
+                 labelnames=('provider',))
+METRICS.callback('ollama_admission_in_flight', 'Ollama calls holding a slot', lambda: OLLAMA_ADMISSION.stats()['in_flight'])
+METRICS.callback('ollama_admission_queue_depth', 'Ollama calls waiting for a slot',
+                 lambda: OLLAMA_ADMISSION.stats()['queue_depth'])
+
+def observe_eval(kind: str, body: dict):
+    """Token count and speed from a finished Ollama response (eval_duration is in ns)"""
+    count = body.get('eval_count')
+    duration = body.get('eval_duration')
+    if count:
+        OLLAMA_TOKENS.inc(kind, amount=count)
+        if duration:
+            OLLAMA_TOKENS_PER_SECOND.observe(count / (duration / 1e9), kind)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc(g.metrics_route)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    route, method, status = g.metrics_route, request.method, str(response.status_code)
+
+    # Recorded when the body has been sent, so streamed replies are timed in full
+    def done():
+        HTTP_IN_FLIGHT.dec(route)
+        HTTP_SECONDS.observe(time.perf_counter() - started, route, method, status)
+    response.call_on_close(done)
+    return response
+
+# -----------------------------
+# Profiling (opt-in)
+# -----------------------------
+# PROFILE_SAMPLE_RATE (0-1) of requests have their stacks sampled every PROFILE_INTERVAL_MS;
+# those taking PROFILE_SLOW_MS or longer are written to PROFILE_DIR/<route>/ as collapsed
+# stacks (flamegraph.pl, speedscope), keeping the newest PROFILE_KEEP per route. A request
+# with the header X-Profile-Token: <PROFILE_ADMIN_TOKEN> is always profiled and written.
+# With neither set, no hooks are installed and requests pay nothing.
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_ADMIN_TOKEN = os.getenv('PROFILE_ADMIN_TOKEN', '')
+PROFILER = None
+if PROFILE_SAMPLE_RATE > 0 or PROFILE_ADMIN_TOKEN:
+    PROFILER = RequestProfiler(
+        os.getenv('PROFILE_DIR', 'profiles'),
+        interval=float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000,
+        slow_seconds=float(os.getenv('PROFILE_SLOW_MS', '500')) / 1000,
+        keep=int(os.getenv('PROFILE_KEEP', '50')),
+    )
+
+def start_profile():
+    forced = bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest(
+        request.headers.get('X-Profile-Token', ''), PROFILE_ADMIN_TOKEN)
+    if forced or random.random() < PROFILE_SAMPLE_RATE:
+        g.profile = PROFILER.begin()
+        g.profile_forced = forced
+
+def finish_profile(response):
+    profile = g.get('profile')
+    if profile is None:
+        return response
+    route, forced = request.url_rule.rule if request.url_rule else 'unmatched', g.profile_forced
+    if forced:
+        response.headers['X-Profile-Id'] = profile['id']
+
+    # Stopped when the body has been sent, so streamed replies are profiled in full
+    def done():
+        try:
+            path = PROFILER.end(profile, route, forced)
+            if path:
+                log(f"🔬 Profile written: {path}")
+        except Exception as e:
+            log(f"💥 Writing profile failed: {e}")
+    response.call_on_close(done)
+    return response
+
+if PROFILER is not None:
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+
 # -----------------------------
 # Context store (per session)
 # -----------------------------
-# chat_state = { session_id: {"context": [...], "ts": float} }
-chat_state = defaultdict(dict)
+# Ollama contexts per session_id, evicted when idle for SESSION_IDLE_TTL seconds or when
+# more than SESSION_MAX_TOKENS context tokens are held. SESSION_STORE=sqlite shares them
+# between workers via SESSION_STORE_PATH.
+SESSIONS = open_session_store(
+    os.getenv('SESSION_STORE', 'memory'),
+    os.getenv('SESSION_STORE_PATH'),
+    max_tokens=int(os.getenv('SESSION_MAX_TOKENS', '2000000')),
+    idle_ttl=float(os.getenv('SESSION_IDLE_TTL', '3600')),
+)
 
-def warm_ollama():
-    # Do a micro request to load model into memory
-    time.sleep(0.5)
-    try:
-        SESSION.post(f"{OLLAMA_BASE_URL}/api/chat", json={
-            "model": DEFAULT_MODEL,
-            "messages": [{"role": "user", "content": "."}],
-            "options": {"num_predict": 1},
-            "keep_alive": "24h",
-            "stream": False
-        }, timeout=(5, 20))
-    except Exception as e:
-        log(f"Warmup failed (ok to ignore): {e}")
+def ollama_chat(payload: dict, kind: str = 'chat', timeout=DEFAULT_TIMEOUT, session_id: str = None):
+    """POST /api/chat (non-streaming) to a pool host once admitted; raises Overloaded when the queue is full"""
+    with OLLAMA_ADMISSION.slot(kind), OLLAMA_POOL.lease(session_id) as host:
+        started = time.perf_counter()
+        try:
+            return SESSION.post(f'{host.url}/api/chat', json=payload, timeout=timeout)
+        finally:
+            OLLAMA_SECONDS.observe(time.perf_counter() - started, kind)
+
+def stream_ollama_chat(payload: dict, timeout=DEFAULT_TIMEOUT, kind: str = 'chat', session_id: str = None,
+                       cancel: threading.Event = None):
+    """POST /api/chat with stream=True; yields each JSON chunk as Ollama produces it.
+    The admission slot and host lease are held until the stream ends or the generator is closed.
+    Yields nothing if `cancel` is set by the time a slot is granted."""
+    payload = dict(payload, stream=True)
+    with OLLAMA_ADMISSION.slot(kind):
+        if cancel is not None and cancel.is_set():
+            return
+        yield from _stream_leased(payload, timeout, kind, session_id)
+
+def _stream_leased(payload: dict, timeout, kind: str, session_id: str = None):
+    with OLLAMA_POOL.lease(session_id) as host:
+        started = time.perf_counter()
+        try:
+            with SESSION.post(f'{host.url}/api/chat', json=payload, timeout=timeout, stream=True) as resp:
+                if not resp.ok:
+                    raise requests.exceptions.HTTPError(f'Ollama error: {resp.status_code} - {resp.text}')
+                for line in resp.iter_lines():
+                    if line:
+                        chunk = json.loads(line)
+                        if chunk.get('done'):
+                            observe_eval(kind, chunk)
+                        yield chunk
+        finally:
+            OLLAMA_SECONDS.observe(time.perf_counter() - started, kind)
+
+def overloaded_response(e: Overloaded):
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@contextmanager
+def ollama_call(kind: str):
+    """Admission slot and duration metric for Ollama calls made by the pool itself (warm-ups)"""
+    with OLLAMA_ADMISSION.slot(kind):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            OLLAMA_SECONDS.observe(time.perf_counter() - started, kind)
 
-threading.Thread(target=warm_ollama, daemon=True).start()
+# Probe every host and load the model into memory wherever it isn't resident; warm-ups
+# queue for admission (lowest priority) like every other Ollama call
+OLLAMA_POOL.call_guard = ollama_call
+OLLAMA_POOL.start()
 
 # -----------------------------
 # Views
@@ -120,16 +438,37 @@ def test():
 # -----------------------------
 # Translation helpers
 # -----------------------------
-@lru_cache(maxsize=4096)
 def google_translate_it_en_raw(word: str):
-    url = "https://translate.googleapis.com/translate_a/single"
+    url = GOOGLE_TRANSLATE_URL
     params = {'client': 'gtx', 'sl': 'it', 'tl': 'en', 'dt': 't', 'q': word}
-    r = SESSION.get(url, params=params, timeout=(3, 8))
+    r = SESSION.get(url, params=params, timeout=GOOGLE_TIMEOUT)
     r.raise_for_status()
     return r.json()
 
-def get_ai_translation(word, context=""):
-    """Get AI-powered translation for a word using Ollama"""
+def coalesce_key(provider: str, word: str, context: str = "") -> str:
+    """SingleFlight key; provider and word always count, so the hedged run never waits on itself"""
+    return cache_key(provider, word, context if 'context' in TRANSLATE_COALESCE_KEY else '')
+
+def google_translations(word: str, cancel: threading.Event = None):
+    """Distinct English translations from Google (up to 3), or None; transport errors propagate"""
+    try:
+        raw = TRANSLATE_FLIGHT.do(coalesce_key('google', word), lambda: google_translate_it_en_raw(word))
+    except Exception as e:
+        log(f"💥 Google Translate exception: {e}")
+        raise  # not cached: the breaker decides when Google is worth another try
+    all_translations = []
+    if raw and len(raw) > 0 and isinstance(raw[0], list):
+        for block in raw[0]:
+            if block and len(block) > 0 and isinstance(block[0], str):
+                eng = block[0]
+                if eng and eng.lower() != word.lower() and eng not in all_translations:
+                    all_translations.append(eng)
+    TRANSLATION_CACHE.put('google', word, all_translations or None)
+    return all_translations or None
+
+def get_ai_translation(word, context="", cancel: threading.Event = None):
+    """Get AI-powered translation for a word using Ollama (stops early once `cancel` is set);
+    transport and HTTP errors propagate"""
     try:
         log(f"🤖 Getting AI translation for: {word}")
         prompt = (
@@ -145,29 +484,150 @@ def get_ai_translation(word, context=""):
             ],
             'options': OLLAMA_OPTIONS_XLATE,
             'keep_alive': "24h",
-            'stream': False
+            'stream': True
         }
-        resp = SESSION.post(f'{OLLAMA_BASE_URL}/api/chat', json=ai_request, timeout=DEFAULT_TIMEOUT)
-        if resp.status_code == 200:
-            ai_response = resp.json()
-            ai_translation = (ai_response.get('message', {}) or {}).get('content', '').strip()
-            ai_translation = ai_translation.replace('"', '').replace("'", "").strip()
-            log(f"🤖 AI translation: {word} -> {ai_translation}")
-            return ai_translation
-        log(f"❌ AI translation failed: {resp.status_code} {resp.text}")
-        return None
+        parts = []
+        cancel = cancel or threading.Event()
+        if cancel.is_set():
+            return None  # the hedge was already won: don't queue for an Ollama slot
+        chunks = stream_ollama_chat(ai_request, timeout=OLLAMA_XLATE_TIMEOUT, kind='translate', cancel=cancel)
+        finished = False
+        try:
+            for chunk in chunks:
+                if cancel.is_set():
+                    break
+                parts.append((chunk.get('message', {}) or {}).get('content', '') or '')
+                finished = bool(chunk.get('done'))
+        finally:
+            chunks.close()
+        if not finished and cancel.is_set():
+            # Stopped mid-stream, or never started because the slot was granted after the hedge ended
+            log(f"🤖 AI translation cancelled: {word}")
+            return None
+        ai_translation = "".join(parts).strip()
+        ai_translation = ai_translation.replace('"', '').replace("'", "").strip()
+        log(f"🤖 AI translation: {word} -> {ai_translation}")
+        TRANSLATION_CACHE.put('ai', word, ai_translation or None, context)
+        return ai_translation or None
+    except Overloaded:
+        raise  # local backpressure, not a provider failure: don't cache it
     except Exception as e:
         log(f"💥 AI translation error: {str(e)}")
+        raise  # not cached: the breaker decides when Ollama is worth another try
+
+def translate_word(word: str, context: str = ""):
+    """
+    Hedged translation: ('google', [translations]) or ('ai', translation), or None.
+    Cached answers are served first; providers with a cached failure or an open
+    circuit breaker are skipped. Identical concurrent requests share one run.
+    """
+    return TRANSLATE_FLIGHT.do(coalesce_key('hedged', word, context), lambda: _translate_word(word, context))
+
+def _translate_word(word: str, context: str):
+    google_cached = TRANSLATION_CACHE.get('google', word)
+    if google_cached is not MISS and google_cached is not None:
+        return 'google', google_cached
+    ai_cached = TRANSLATION_CACHE.get('ai', word, context)
+    if ai_cached is not MISS and ai_cached is not None:
+        return 'ai', ai_cached
+
+    attempts = []
+    if google_cached is MISS:
+        attempts.append(('google', guarded(google_breaker, lambda cancel: google_translations(word, cancel)), 0.0))
+    if ai_cached is MISS:
+        delay = TRANSLATE_HEDGE_DELAY if attempts else 0.0
+        ai_call = guarded(ollama_breaker, lambda cancel: get_ai_translation(word, context, cancel), ignore=(Overloaded,))
+        attempts.append(('ai', ai_call, delay))
+    if not attempts:
         return None
+    return hedged(attempts, TRANSLATE_DEADLINE, TRANSLATE_EXECUTOR)
 
 # -----------------------------
 # Spaced Repetition API
 # -----------------------------
+def deck_key():
+    """(user_id, deck_id) named by this request, or None for the default deck"""
+    user_id = request.headers.get('X-User-Id') or request.args.get('user')
+    if not user_id:
+        return None
+    return user_id, request.headers.get('X-Deck-Id') or request.args.get('deck') or 'default'
+
+@app.before_request
+def check_deck_key():
+    key = deck_key()
+    if key is not None and not (valid_id(key[0]) and valid_id(key[1])):
+        return jsonify({'error': "User and deck ids must be 1-64 letters, digits, '_', '.', '@' or '-'"}), 400
+
+def current_deck() -> SpacedRepetition:
+    """This request's deck, loaded if needed and held until the request ends"""
+    if 'deck' not in g:
+        key = deck_key()
+        if key is None:
+            g.deck = sr_system
+        else:
+            g.deck = DECKS.acquire(*key)
+            g.deck_key = key
+    return g.deck
+
+@app.teardown_request
+def release_deck(exc=None):
+    key = g.pop('deck_key', None)
+    if key is not None:
+        DECKS.release(*key)
+
+def with_validator(response: Response, etag: str) -> Response:
+    """ETag plus the caching headers every deck response needs, 200 and 304 alike:
+    the deck depends on X-User-Id/X-Deck-Id, so shared caches must key on them"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'X-User-Id, X-Deck-Id'
+    return response
+
 @app.route('/api/sr/words', methods=['GET'])
 def get_words():
+    """
+    All words by default. Optional query params:
+      limit=N&cursor=ID  page through the deck in id order (next_cursor is null on the last page)
+      fields=a,b         only return these fields (id is always included)
+      format=ndjson      stream one JSON word per line instead of a single document
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified.
+    """
     try:
-        words = sr_system.get_all_words()
-        return jsonify({'words': words})
+        deck = current_deck()
+        etag = deck.etag
+        if request.if_none_match.contains(etag):
+            return with_validator(Response(status=304), etag)
+
+        fields = None
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in CARD_FIELDS]
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(1, min(limit, WORDS_MAX_LIMIT))
+        cursor = request.args.get('cursor') or None
+
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                after, remaining = cursor, limit
+                while remaining is None or remaining > 0:
+                    chunk = WORDS_MAX_LIMIT if remaining is None else min(remaining, WORDS_MAX_LIMIT)
+                    words, after = deck.get_words_page(after, chunk, fields)
+                    for word in words:
+                        yield json.dumps(word, ensure_ascii=False) + '\n'
+                    if remaining is not None:
+                        remaining -= len(words)
+                    if after is None:
+                        break
+            response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        elif limit is None and cursor is None and fields is None:
+            response = jsonify({'words': deck.get_all_words()})
+        else:
+            words, next_cursor = deck.get_words_page(cursor, limit, fields)
+            response = jsonify({'words': words, 'next_cursor': next_cursor})
+        return with_validator(response, etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -184,11 +644,32 @@ def add_word():
         if not word or not translation:
             return jsonify({'error': 'Word and translation are required'}), 400
 
-        word_data = sr_system.add_word(word, translation, example, word_type, notes)
+        word_data = current_deck().add_word(word, translation, example, word_type, notes)
         return jsonify({'word': word_data, 'message': 'Word added successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/sr/words/import', methods=['POST'])
+def import_words():
+    """Bulk import: upload a CSV/TSV/JSONL file (multipart 'file' or raw body, ?format=csv|tsv|jsonl)"""
+    try:
+        upload = request.files.get('file')
+        fmt = request.args.get('format') or detect_format(upload.filename if upload else '')
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(IMPORT_FORMATS)}"}), 400
+        skip_duplicates = request.args.get('allow_duplicates', '0') != '1'
+
+        # Parse straight off the request stream; the file is never held in memory
+        source = upload.stream if upload else request.stream
+        summary = current_deck().add_words(
+            iter_rows(text_stream(source), fmt),
+            skip_duplicates=skip_duplicates,
+            progress=lambda s: log(f"📥 Import: {s['processed']} rows, {s['added']} added"),
+        )
+        return jsonify({**summary, 'message': 'Import completed'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/sr/ai-translate', methods=['POST'])
 def ai_translate():
     """Use Google Translate (free endpoint) with fallbacks"""
@@ -199,74 +680,64 @@ def ai_translate():
         if not word:
             return jsonify({'error': 'Word is required'}), 400
 
-        # First try Google (quick)
-        try:
-            raw = google_translate_it_en_raw(word)
-            all_translations = []
-            if raw and len(raw) > 0 and isinstance(raw[0], list):
-                for block in raw[0]:
-                    if block and len(block) > 0 and isinstance(block[0], str):
-                        eng = block[0]
-                        if eng and eng.lower() != word.lower() and eng not in all_translations:
-                            all_translations.append(eng)
-            if all_translations:
-                english_translation = ", ".join(all_translations[:3])
-
-                # quick heuristic word type
+        # Google first; Ollama joins as a hedge if Google is slow or failing
+        outcome = translate_word(word, context)
+        TRANSLATIONS.inc('ai-translate', outcome[0] if outcome else 'none')
+
+        if outcome and outcome[0] == 'google':
+            all_translations = outcome[1]
+            english_translation = ", ".join(all_translations[:3])
+
+            # quick heuristic word type
+            wt = 'noun'
+            if word.endswith(('are', 'ere', 'ire', 'ato', 'uto', 'ito')):
+                wt = 'verb'
+            elif word.endswith(('ante', 'ente')):
+                wt = 'adjective'
+            elif any(word.endswith(p) for p in ['ti','mi','lo','la','li','le','ci','vi','si','ne']):
+                wt = 'verb'
+            elif word in ['di','a','da','in','con','su','per','tra','fra']:
+                wt = 'preposition'
+            elif word in ['e','o','ma','se','che','perché']:
+                wt = 'conjunction'
+            elif word in ['io','tu','lui','lei','noi','voi','loro','mi','ti','ci','vi']:
+                wt = 'pronoun'
+            elif word in ['molto','poco','bene','male','qui','là','oggi','ieri']:
+                wt = 'adverb'
+            elif word in ['ciao','ehi','oh','ah','ecco']:
+                wt = 'interjection'
+            elif word.endswith(('o','a')):
+                wt = 'adjective'
+            else:
                 wt = 'noun'
-                if word.endswith(('are', 'ere', 'ire', 'ato', 'uto', 'ito')):
-                    wt = 'verb'
-                elif word.endswith(('ante', 'ente')):
-                    wt = 'adjective'
+
+            if wt == 'verb':
+                if word.endswith(('ato','uto','ito')):
+                    example = f"Ho {word} ieri."
+                elif word.endswith(('are','ere','ire')):
+                    example = f"Voglio {word}."
                 elif any(word.endswith(p) for p in ['ti','mi','lo','la','li','le','ci','vi','si','ne']):
-                    wt = 'verb'
-                elif word in ['di','a','da','in','con','su','per','tra','fra']:
-                    wt = 'preposition'
-                elif word in ['e','o','ma','se','che','perché']:
-                    wt = 'conjunction'
-                elif word in ['io','tu','lui','lei','noi','voi','loro','mi','ti','ci','vi']:
-                    wt = 'pronoun'
-                elif word in ['molto','poco','bene','male','qui','là','oggi','ieri']:
-                    wt = 'adverb'
-                elif word in ['ciao','ehi','oh','ah','ecco']:
-                    wt = 'interjection'
-                elif word.endswith(('o','a')):
-                    wt = 'adjective'
-                else:
-                    wt = 'noun'
-
-                if wt == 'verb':
-                    if word.endswith(('ato','uto','ito')):
-                        example = f"Ho {word} ieri."
-                    elif word.endswith(('are','ere','ire')):
-                        example = f"Voglio {word}."
-                    elif any(word.endswith(p) for p in ['ti','mi','lo','la','li','le','ci','vi','si','ne']):
-                        example = f"Posso {word}."
-                    else:
-                        example = f"Devo {word}."
-                elif wt == 'noun':
-                    example = f"Questo è un {word}."
-                elif wt == 'adjective':
-                    example = f"È molto {word}."
+                    example = f"Posso {word}."
                 else:
-                    example = f"Uso {word} spesso."
+                    example = f"Devo {word}."
+            elif wt == 'noun':
+                example = f"Questo è un {word}."
+            elif wt == 'adjective':
+                example = f"È molto {word}."
+            else:
+                example = f"Uso {word} spesso."
 
-                return jsonify({
-                    'translation': english_translation,
-                    'example': example,
-                    'word_type': wt,
-                    'success': True,
-                    'all_translations': all_translations
-                })
-
-        except Exception as e:
-            log(f"💥 Google Translate exception: {e}")
+            return jsonify({
+                'translation': english_translation,
+                'example': example,
+                'word_type': wt,
+                'success': True,
+                'all_translations': all_translations
+            })
 
-        # If Google fails, fallback AI or stub
-        ai_translation = get_ai_translation(word, context)
-        if ai_translation:
+        if outcome:
             return jsonify({
-                'translation': ai_translation,
+                'translation': outcome[1],
                 'example': f"Esempio con {word}.",
                 'word_type': 'noun',
                 'success': True,
@@ -296,19 +767,42 @@ def ai_translate_word():
             return jsonify({'error': 'Word is required'}), 400
 
         log(f"🤖 AI translation request for: {word}")
-        ai_translation = get_ai_translation(word, context)
+        ai_translation = TRANSLATION_CACHE.get('ai', word, context)
+        if ai_translation is MISS:
+            ai_call = guarded(ollama_breaker, lambda cancel: get_ai_translation(word, context, cancel), ignore=(Overloaded,))
+            try:
+                ai_translation = TRANSLATE_FLIGHT.do(coalesce_key('ai', word, context), lambda: ai_call(threading.Event()))
+            except Overloaded:
+                raise
+            except Exception:
+                ai_translation = None  # already logged and counted by the breaker
+        TRANSLATIONS.inc('ai-translate-word', 'ai' if ai_translation else 'none')
         if ai_translation:
             return jsonify({'translation': ai_translation, 'source': 'ai', 'success': True})
         return jsonify({'error': 'AI translation failed', 'success': False}), 500
 
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         log(f"💥 Server error in ai_translate_word: {e}")
         return jsonify({'error': f'Server error: {e}'}), 500
 
+@app.route('/api/sr/translation-cache', methods=['GET'])
+def get_translation_cache_stats():
+    try:
+        return jsonify(TRANSLATION_CACHE.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sr/coalescing', methods=['GET'])
+def get_coalescing_stats():
+    """How many translation calls were answered by an identical call already in flight"""
+    return jsonify(TRANSLATE_FLIGHT.stats())
+
 @app.route('/api/sr/words/<word_id>', methods=['DELETE'])
 def delete_word(word_id):
     try:
-        success = sr_system.delete_word(word_id)
+        success = current_deck().delete_word(word_id)
         if success:
             return jsonify({'message': 'Word deleted successfully'})
         return jsonify({'error': 'Word not found'}), 404
@@ -318,7 +812,7 @@ def delete_word(word_id):
 @app.route('/api/sr/due', methods=['GET'])
 def get_due_words():
     try:
-        due_words = sr_system.get_due_words()
+        due_words = current_deck().get_due_words()
         return jsonify({'words': due_words})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -326,7 +820,7 @@ def get_due_words():
 @app.route('/api/sr/overdue', methods=['GET'])
 def get_overdue_words():
     try:
-        overdue_words = sr_system.get_overdue_words()
+        overdue_words = current_deck().get_overdue_words()
         return jsonify({'words': overdue_words})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -342,17 +836,40 @@ def review_word():
         if not isinstance(quality, int) or quality < 0 or quality > 5:
             return jsonify({'error': 'Quality must be an integer between 0 and 5'}), 400
 
-        word_data = sr_system.review_word(word_id, quality)
+        word_data = current_deck().review_word(word_id, quality)
         return jsonify({'word': word_data, 'message': 'Review completed'})
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/sr/review/batch', methods=['POST'])
+def review_words_batch():
+    """Apply [{word_id, quality, reviewed_at}, ...] in reviewed_at order with one save; per-item results"""
+    try:
+        data = request.get_json(force=True)
+        reviews = data.get('reviews') if isinstance(data, dict) else data
+        if not isinstance(reviews, list) or not reviews:
+            return jsonify({'error': 'reviews must be a non-empty list'}), 400
+        if len(reviews) > REVIEW_BATCH_MAX:
+            return jsonify({'error': f'At most {REVIEW_BATCH_MAX} reviews per batch'}), 400
+
+        results = current_deck().review_words(reviews)
+        reviewed = sum(1 for r in results if r['success'])
+        return jsonify({
+            'results': results,
+            'reviewed': reviewed,
+            'failed': len(results) - reviewed,
+            'message': 'Batch review completed'
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/sr/stats', methods=['GET'])
 def get_stats():
     try:
-        stats = sr_system.get_stats()
+        detailed = request.args.get('detail', '0') == '1'
+        stats = current_deck().get_stats(detailed)
         return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -361,7 +878,7 @@ def get_stats():
 def get_upcoming_reviews():
     try:
         days_ahead = request.args.get('days', 7, type=int)
-        upcoming = sr_system.get_upcoming_reviews(days_ahead)
+        upcoming = current_deck().get_upcoming_reviews(days_ahead)
         return jsonify({'upcoming': upcoming})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -370,15 +887,20 @@ def get_upcoming_reviews():
 def get_daily_upcoming_counts():
     try:
         days_ahead = request.args.get('days', 7, type=int)
-        daily_counts = sr_system.get_daily_upcoming_counts(days_ahead)
-        return jsonify({'daily_counts': daily_counts})
+        group = request.args.get('group', 'day')
+        counts = current_deck().get_daily_upcoming_counts(days_ahead, group)
+        if group == 'day':
+            return jsonify({'daily_counts': counts})
+        return jsonify({'counts': counts, 'group': group})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/sr/words/<word_id>/next-review', methods=['GET'])
 def get_word_next_review(word_id):
     try:
-        review_info = sr_system.get_next_review_info(word_id)
+        review_info = current_deck().get_next_review_info(word_id)
         return jsonify(review_info)
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
@@ -388,7 +910,7 @@ def get_word_next_review(word_id):
 @app.route('/api/sr/words/<word_id>/review-preview', methods=['GET'])
 def get_word_review_preview(word_id):
     try:
-        preview = sr_system.get_review_preview(word_id)
+        preview = current_deck().get_review_preview(word_id)
         return jsonify({'preview': preview})
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
@@ -398,10 +920,164 @@ def get_word_review_preview(word_id):
 # -----------------------------
 # Chat endpoint (Ollama) — no vocabulary injection
 # -----------------------------
-def validate_and_regenerate_response(initial_response: str, mode: str, message: str, system_content: str, current_vocabulary):
+
+def sse(event: str, data) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def chat_payload(message: str, strict_mode: bool):
+    """System prompt and Ollama request for a chat turn"""
+    system_content = (STRICT_SYS if strict_mode else LEARN_SYS)
+    user_tail = '⚠️ Solo parole già apprese!' if strict_mode else '⚠️ Max 5 parole nuove'
+    payload = {
+        'model': DEFAULT_MODEL,
+        'messages': [
+            {'role': 'system', 'content': system_content},
+            {'role': 'user', 'content': f"{message}\n\n{user_tail}"}
+        ],
+        'options': OLLAMA_OPTIONS_CHAT,
+        'keep_alive': "24h",
+        'stream': False
+    }
+    return system_content, payload
+
+def regen_payload(mode: str, message: str, system_content: str):
+    """Second-attempt request with the vocabulary rule spelled out"""
+    rule = "Regola assoluta: usa solo parole già apprese." if mode == 'strict' else "Massimo 5 parole nuove."
+    return {
+        'model': DEFAULT_MODEL,
+        'messages': [
+            {'role': 'system', 'content': system_content + "\n\n" + rule},
+            {'role': 'user', 'content': message}
+        ],
+        'options': OLLAMA_OPTIONS_CHAT,
+        'keep_alive': "24h",
+        'stream': False
+    }
+
+def needs_regeneration(mode: str, new_words) -> bool:
+    return bool(new_words) if mode == 'strict' else len(new_words) > 5
+
+# Early-abort counters (GET /api/chat/enforcement-stats). tokens_saved is an upper bound:
+# num_predict minus the tokens already generated when a reply was cancelled.
+enforcement_stats = {
+    'strict_replies': 0,
+    'aborts': 0,
+    'regenerations': 0,
+    'truncations': 0,
+    'tokens_generated': 0,
+    'tokens_saved': 0,
+}
+enforcement_lock = threading.Lock()
+METRICS.callback('chat_enforcement_total', 'Strict-mode enforcement counters (see /api/chat/enforcement-stats)',
+                 lambda: {(key,): n for key, n in enforcement_stats.items()}, type='counter', labelnames=('event',))
+
+def count_enforcement(**increments):
+    with enforcement_lock:
+        for key, n in increments.items():
+            enforcement_stats[key] += n
+
+def run_generation(payload: dict, vocab_lower: set, session_id: str, abort_on_unknown: bool = False,
+                   save_context: bool = True):
+    """
+    Stream one Ollama generation, yielding ('token', delta) and ('new_words', words) events.
+    With abort_on_unknown the stream is closed (cancelling generation) as soon as an unknown
+    word completes. save_context stores the final Ollama context as the session's (only for
+    the conversation's own turn, not a context-free regeneration). Returns (text, checker, aborted).
+    """
+    checker = StreamWordChecker(vocab_lower)
+    parts = []
+    tokens = 0
+    chunks = stream_ollama_chat(payload, session_id=session_id)
+    try:
+        for chunk in chunks:
+            delta = (chunk.get('message', {}) or {}).get('content', '') or ''
+            if delta:
+                tokens += 1
+                parts.append(delta)
+                yield 'token', delta
+                new_words = checker.feed(delta)
+                if new_words:
+                    yield 'new_words', new_words
+                    if abort_on_unknown:
+                        num_predict = payload.get('options', {}).get('num_predict', tokens)
+                        count_enforcement(aborts=1, tokens_generated=tokens,
+                                          tokens_saved=max(0, num_predict - tokens))
+                        return "".join(parts), checker, True
+            if save_context and chunk.get('done') and 'context' in chunk:
+                SESSIONS.set_context(session_id, chunk['context'])
+    finally:
+        chunks.close()  # drops the connection, which stops Ollama generating
+    new_words = checker.flush()
+    if new_words:
+        yield 'new_words', new_words
+    if abort_on_unknown:
+        count_enforcement(tokens_generated=tokens)
+    return "".join(parts), checker, False
+
+def known_prefix(checker: StreamWordChecker) -> str:
+    """The words generated before the first unknown one"""
+    prefix = []
+    for word in checker.words:
+        if word not in checker.vocab:
+            break
+        prefix.append(word)
+    return " ".join(prefix[:10])
+
+def enforced_reply(mode: str, message: str, system_content: str, payload: dict, vocab_lower: set, session_id: str):
+    """
+    Generate a reply that keeps the vocabulary rule, yielding token/new_words/retry events.
+    Returns the final (untidied) text.
+    """
+    early = mode == 'strict' and STRICT_ENFORCEMENT == 'early'
+    if mode == 'strict':
+        count_enforcement(strict_replies=1)
+    text, checker, aborted = yield from run_generation(payload, vocab_lower, session_id, early)
+    if not needs_regeneration(mode, checker.new_words):
+        return text
+    yield 'retry', {'reason': 'vocabulary', 'new_words': checker.new_words, 'aborted': aborted}
+    CHAT_REGENERATIONS.inc(mode)
+    if mode == 'strict':
+        count_enforcement(regenerations=1)
+    # Like the non-streaming path, the session keeps the context of the first generation
+    text, checker, aborted = yield from run_generation(
+        regen_payload(mode, message, system_content), vocab_lower, session_id, early, save_context=False)
+    if mode == 'strict' and checker.new_words:
+        count_enforcement(truncations=1)
+        # last resort, as in validate_and_regenerate_response
+        if aborted:
+            text = known_prefix(checker)
+        else:
+            text = " ".join([w for w in checker.words if w in vocab_lower][:10])
+        text = text or "Non posso rispondere con altre parole."
+    return text
+
+def drain(events):
+    """Run an event generator to completion, returning its result"""
+    while True:
+        try:
+            next(events)
+        except StopIteration as stop:
+            return stop.value
+
+def chat_vocabulary(data: dict):
+    """
+    Known words for validating a chat reply, and their version tag. The server's own deck
+    is used unless the client sends an explicit current_vocabulary list (older clients).
+    """
+    if data.get('current_vocabulary') is not None:
+        return KnownWordMatcher((w, '') for w in data['current_vocabulary']), None
+    return current_deck().known_words()
+
+def chat_session_id(data: dict) -> str:
+    """The client's session_id, scoped to its user so learners never share an Ollama context"""
+    session_id = data.get('session_id', 'default')
+    key = deck_key()
+    return session_id if key is None else f"{key[0]}:{session_id}"
+
+def validate_and_regenerate_response(initial_response: str, mode: str, message: str, system_content: str, vocab_lower):
     """Two-pass validation; strict: enforce vocab, learning: limit new words."""
     response = initial_response or ""
-    vocab_lower = {w.lower() for w in (current_vocabulary or [])}
 
     for attempt in range(2):
         words_in_response, new_words = check_words(response, vocab_lower)
@@ -410,19 +1086,13 @@ def validate_and_regenerate_response(initial_response: str, mode: str, message:
         if mode == 'strict':
             if new_words:
                 if attempt == 0:
-                    regen_request = {
-                        'model': DEFAULT_MODEL,
-                        'messages': [
-                            {'role': 'system', 'content': system_content + "\n\nRegola assoluta: usa solo parole già apprese."},
-                            {'role': 'user', 'content': message}
-                        ],
-                        'options': OLLAMA_OPTIONS_CHAT,
-                        'keep_alive': "24h",
-                        'stream': False
-                    }
-                    resp = SESSION.post(f'{OLLAMA_BASE_URL}/api/chat', json=regen_request, timeout=DEFAULT_TIMEOUT)
+                    CHAT_REGENERATIONS.inc(mode)
+                    regen_request = regen_payload(mode, message, system_content)
+                    resp = ollama_chat(regen_request)
                     if resp.ok:
-                        response = (resp.json().get('message', {}) or {}).get('content', response)
+                        out = resp.json()
+                        observe_eval('chat', out)
+                        response = (out.get('message', {}) or {}).get('content', response)
                         continue
                 # last resort: filter to allowed words (≤10)
                 allowed = [w for w in words_in_response if w in vocab_lower][:10]
@@ -432,19 +1102,13 @@ def validate_and_regenerate_response(initial_response: str, mode: str, message:
         else:  # learning
             if len(new_words) > 5:
                 if attempt == 0:
-                    regen_request = {
-                        'model': DEFAULT_MODEL,
-                        'messages': [
-                            {'role': 'system', 'content': system_content + "\n\nMassimo 5 parole nuove."},
-                            {'role': 'user', 'content': message}
-                        ],
-                        'options': OLLAMA_OPTIONS_CHAT,
-                        'keep_alive': "24h",
-                        'stream': False
-                    }
-                    resp = SESSION.post(f'{OLLAMA_BASE_URL}/api/chat', json=regen_request, timeout=DEFAULT_TIMEOUT)
+                    CHAT_REGENERATIONS.inc(mode)
+                    regen_request = regen_payload(mode, message, system_content)
+                    resp = ollama_chat(regen_request)
                     if resp.ok:
-                        response = (resp.json().get('message', {}) or {}).get('content', response)
+                        out = resp.json()
+                        observe_eval('chat', out)
+                        response = (out.get('message', {}) or {}).get('content', response)
                         continue
             break
 
@@ -459,56 +1123,51 @@ def chat():
 
         message = (data.get('message') or '').strip()
         strict_mode = bool(data.get('strict_mode', False))
-        current_vocabulary = data.get('current_vocabulary') or []
-        session_id = data.get('session_id', 'default')
+        vocab_lower, vocabulary_version = chat_vocabulary(data)
+        session_id = chat_session_id(data)
 
         if not message:
             return jsonify({'error': 'Message is required'}), 400
 
         # Do NOT inject the vocabulary into the prompt
-        system_content = (STRICT_SYS if strict_mode else LEARN_SYS)
-        user_tail = '⚠️ Solo parole già apprese!' if strict_mode else '⚠️ Max 5 parole nuove'
-
-        payload = {
-            'model': DEFAULT_MODEL,
-            'messages': [
-                {'role': 'system', 'content': system_content},
-                {'role': 'user', 'content': f"{message}\n\n{user_tail}"}
-            ],
-            'options': OLLAMA_OPTIONS_CHAT,
-            'keep_alive': "24h",
-            'stream': False
-        }
+        system_content, payload = chat_payload(message, strict_mode)
 
         # Reuse Ollama context to avoid re-prefilling prompts
-        if 'context' in chat_state[session_id]:
-            payload['context'] = chat_state[session_id]['context']
+        context = SESSIONS.get_context(session_id)
+        if context:
+            payload['context'] = context
+
+        if strict_mode and STRICT_ENFORCEMENT == 'early':
+            text = drain(enforced_reply('strict', message, system_content, payload, vocab_lower, session_id))
+            return jsonify({'response': tidy(text), 'model': DEFAULT_MODEL, 'vocabulary_version': vocabulary_version})
 
-        log(f"Attempting to connect to Ollama at: {OLLAMA_BASE_URL}")
-        resp = SESSION.post(f'{OLLAMA_BASE_URL}/api/chat', json=payload, timeout=DEFAULT_TIMEOUT)
+        log(f"Attempting to connect to Ollama ({len(OLLAMA_POOL)} host(s))")
+        resp = ollama_chat(payload, session_id=session_id)
         log(f"Ollama response status: {resp.status_code}")
 
         if not resp.ok:
             return jsonify({'error': f'Ollama error: {resp.status_code} - {resp.text}'}), 500
 
         out = resp.json()
+        observe_eval('chat', out)
         ai_message = (out.get('message', {}) or {}).get('content', '') or ''
 
         # Save new context for this session
         if 'context' in out:
-            chat_state[session_id]['context'] = out['context']
-            chat_state[session_id]['ts'] = time.time()
+            SESSIONS.set_context(session_id, out['context'])
 
         final_response = validate_and_regenerate_response(
             ai_message,
             'strict' if strict_mode else 'learning',
             message,
             system_content,
-            current_vocabulary
+            vocab_lower
         )
 
-        return jsonify({'response': final_response, 'model': DEFAULT_MODEL})
+        return jsonify({'response': final_response, 'model': DEFAULT_MODEL, 'vocabulary_version': vocabulary_version})
 
+    except Overloaded as e:
+        return overloaded_response(e)
     except requests.exceptions.RequestException as e:
         log(f"Request exception: {e}")
         return jsonify({'error': f'Connection error: {e}'}), 502
@@ -516,6 +1175,64 @@ def chat():
         log(f"General exception: {e}")
         return jsonify({'error': f'Server error: {e}'}), 500
     
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same request body as /api/chat, answered as Server-Sent Events:
+      token {content}     a piece of the reply, as soon as Ollama produces it
+      new_words {words}   unknown words, reported as each one completes
+      retry {reason, new_words, aborted}  the reply broke the vocabulary rule (and was cut
+                          short if aborted); discard it, a new one follows
+      done {response, model, new_words, vocabulary_version}   the final (validated, tidied) reply
+      error {error, retry_after?}   retry_after is set when Ollama's queue was full
+    """
+    data = request.get_json(force=True)
+    message = (data.get('message') or '').strip()
+    strict_mode = bool(data.get('strict_mode', False))
+    vocab_lower, vocabulary_version = chat_vocabulary(data)
+    session_id = chat_session_id(data)
+
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    mode = 'strict' if strict_mode else 'learning'
+    system_content, payload = chat_payload(message, strict_mode)
+    context = SESSIONS.get_context(session_id)
+    if context:
+        payload['context'] = context
+
+    def generate():
+        started = time.time()
+        try:
+            events = enforced_reply(mode, message, system_content, payload, vocab_lower, session_id)
+            while True:
+                try:
+                    event, value = next(events)
+                except StopIteration as stop:
+                    text = stop.value
+                    break
+                if event == 'token':
+                    yield sse('token', {'content': value})
+                elif event == 'new_words':
+                    yield sse('new_words', {'words': value})
+                else:
+                    yield sse(event, value)
+            log(f"Stream ({mode}) | {time.time() - started:.2f}s")
+            final_words = check_words(text, vocab_lower)[1]
+            yield sse('done', {'response': tidy(text), 'model': DEFAULT_MODEL, 'new_words': final_words,
+                               'vocabulary_version': vocabulary_version})
+        except Overloaded as e:
+            yield sse('error', {'error': str(e), 'retry_after': e.retry_after})
+        except requests.exceptions.RequestException as e:
+            log(f"Stream request exception: {e}")
+            yield sse('error', {'error': f'Connection error: {e}'})
+        except Exception as e:
+            log(f"Stream exception: {e}")
+            yield sse('error', {'error': f'Server error: {e}'})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/sr/search', methods=['GET'])
 def search_words():
     """Search words by query. Always returns 200 with a JSON payload."""
@@ -525,19 +1242,67 @@ def search_words():
         if len(q) < 2:
             return jsonify({'words': []})
 
-        results = sr_system.search_words(q)  # expects a list of word objects/dicts
+        # Ranked best-first; broad queries are cut off rather than returning the whole deck
+        limit = max(1, min(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), SEARCH_MAX_LIMIT))
+        results = current_deck().search_words(q, limit)  # expects a list of word objects/dicts
         return jsonify({'words': results})
     except Exception as e:
         # Still return JSON; avoid 404/HTML so the client can JSON.parse safely
         return jsonify({'error': str(e), 'words': []}), 200
 
+@app.route('/api/chat/enforcement-stats', methods=['GET'])
+def get_enforcement_stats():
+    with enforcement_lock:
+        stats = dict(enforcement_stats)
+    return jsonify({'mode': STRICT_ENFORCEMENT, **stats})
+
+@app.route('/api/ollama/hosts', methods=['GET'])
+def get_ollama_hosts():
+    return jsonify(OLLAMA_POOL.stats())
+
+@app.route('/api/ollama/queue', methods=['GET'])
+def get_ollama_queue_stats():
+    return jsonify(OLLAMA_ADMISSION.stats())
+
+@app.route('/api/sr/decks', methods=['GET'])
+def list_decks():
+    """The requesting user's decks on disk"""
+    key = deck_key()
+    if key is None:
+        return jsonify({'error': 'X-User-Id header or user parameter is required'}), 400
+    try:
+        ext = os.path.splitext(deck_path(SR_DECKS_DIR, key[0], 'default', SR_STORAGE))[1]
+        user_dir = os.path.join(SR_DECKS_DIR, key[0])
+        names = os.listdir(user_dir) if os.path.isdir(user_dir) else []
+        # A journal deck may not have its first snapshot yet
+        names = {n[:-len('.journal')] if n.endswith('.journal') else n for n in names}
+        decks = sorted(n[:-len(ext)] for n in names if n.endswith(ext))
+        return jsonify({'user': key[0], 'decks': decks})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sr/decks/stats', methods=['GET'])
+def get_deck_stats():
+    """Resident decks and load/eviction counters for this process"""
+    return jsonify(DECKS.stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(METRICS.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.post("/api/chat/reset")
 def reset_chat():
     data = request.get_json(silent=True) or {}
-    session_id = data.get("session_id", "default")
-    chat_state.pop(session_id, None)
+    SESSIONS.delete(chat_session_id(data))
     return jsonify({"ok": True})
 
+@app.route('/api/chat/sessions', methods=['GET'])
+def get_session_stats():
+    try:
+        return jsonify(SESSIONS.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # -----------------------------
 # Entrypoint
 # -----------------------------
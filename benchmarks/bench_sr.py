@@ -0,0 +1,225 @@
+"""Micro-benchmarks for the SpacedRepetition engine on synthetic decks.
+
+Builds decks of the requested sizes with a realistic spread of review state
+(most cards scheduled over the coming weeks, a tail months out, ~10%
+overdue, a few never reviewed) and times the engine's hot paths on each.
+Results are written as JSON; given a baseline file, any operation that got
+slower than the tolerance allows is reported and the exit status is 1, so
+the script can gate a deploy.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_sr.py                               # 1k, 10k, 100k
+    python benchmarks/bench_sr.py --sizes 1000,10000,100000,1000000
+    python benchmarks/bench_sr.py --output bench.json --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_sr.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytz  # noqa: E402
+
+from spaced_repetition import SpacedRepetition  # noqa: E402
+from storage import open_storage  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+SEARCH_QUERIES = ("ca", "par", "amore", "zz", "bello", "tre")
+# Differences below this many seconds are noise, whatever the ratio
+NOISE_FLOOR = 0.001
+
+_SYLLABLES = ("ca", "sa", "ne", "to", "ri", "la", "mo", "pe", "li", "so", "va", "re", "bel", "par", "tre",
+              "zio", "gno", "chi", "ghe", "sce", "amo", "ri", "co", "du", "fi")
+_ENDINGS = ("o", "a", "e", "i", "are", "ere", "ire", "zione", "mente", "tà")
+_TYPES = ("noun", "verb", "adjective", "adverb", "preposition", "")
+
+def _synthetic_word(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3))) + rng.choice(_ENDINGS)
+
+def synthetic_card(i: int, now: datetime, rng: random.Random) -> Dict:
+    """One card with plausible review state relative to `now`"""
+    word = _synthetic_word(rng)
+    created = now - timedelta(days=rng.uniform(0, 720))
+    card = {
+        "id": str(1_700_000_000_000 + i),
+        "word": word,
+        "translation": f"{word} (en)",
+        "example": f"Questo è {word}." if rng.random() < 0.5 else "",
+        "word_type": rng.choice(_TYPES),
+        "notes": "" if rng.random() < 0.8 else f"nota su {word}",
+        "created": created.isoformat(),
+        "last_reviewed": None,
+        "next_review": created.isoformat(),
+        "interval": 0,
+        "ease_factor": 2.5,
+        "review_count": 0,
+        "correct_count": 0,
+        "incorrect_count": 0,
+    }
+    if rng.random() < 0.05:
+        return card  # never reviewed: due since creation
+    reviews = max(1, int(rng.expovariate(1 / 8)))
+    correct = sum(rng.random() < 0.85 for _ in range(reviews))
+    interval = max(1, min(3650, int(rng.lognormvariate(2.3, 1.1))))
+    if rng.random() < 0.10:
+        next_review = now - timedelta(days=rng.uniform(0, 30))  # overdue
+    else:
+        next_review = now + timedelta(days=rng.uniform(0, interval), seconds=rng.uniform(0, 86400))
+    card.update({
+        "last_reviewed": (next_review - timedelta(days=interval)).isoformat(),
+        "next_review": next_review.isoformat(),
+        "interval": interval,
+        "ease_factor": round(rng.uniform(1.3, 2.9), 2),
+        "review_count": reviews,
+        "correct_count": correct,
+        "incorrect_count": reviews - correct,
+    })
+    return card
+
+def write_deck(path: str, size: int, seed: int = 42):
+    """Stream a synthetic vocabulary.json (no whole-deck dict in memory)"""
+    rng = random.Random(seed)
+    now = datetime.now(pytz.timezone("Australia/Melbourne"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i in range(size):
+            card = synthetic_card(i, now, rng)
+            f.write(("," if i else "") + "\n  " + json.dumps(card["id"]) + ": " + json.dumps(card, ensure_ascii=False))
+        f.write("\n}")
+
+def _time(fn: Callable, repeat: int) -> float:
+    """Median wall time of `repeat` calls, in seconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def bench_size(size: int, repeat: int, reviews: int, storage_kind: str, workdir: str) -> Dict[str, float]:
+    path = os.path.join(workdir, f"deck_{size}.json")
+    write_deck(path, size)
+    if storage_kind != "json":
+        # Convert the generated deck into the backend under test
+        source = SpacedRepetition(data_file=path)
+        target = open_storage(storage_kind, os.path.join(workdir, f"deck_{size}.{storage_kind}"))
+        target.save_all(source._card_dicts())
+        target.close()
+        del source
+
+    def open_engine():
+        if storage_kind == "json":
+            return SpacedRepetition(data_file=path)
+        return SpacedRepetition(storage=open_storage(storage_kind, os.path.join(workdir, f"deck_{size}.{storage_kind}")))
+
+    results = {}
+    load_repeat = 1 if size >= 100_000 else repeat
+    results["load"] = _time(lambda: open_engine().storage.close(), load_repeat)
+    sr = open_engine()
+    results["load_vocabulary"] = _time(sr.load_vocabulary, load_repeat)
+    results["save_vocabulary"] = _time(sr.save_vocabulary, load_repeat)
+    results["get_due_words"] = _time(sr.get_due_words, repeat)
+    results["get_upcoming_reviews"] = _time(sr.get_upcoming_reviews, repeat)
+    results["get_daily_upcoming_counts"] = _time(sr.get_daily_upcoming_counts, repeat)
+    results["get_daily_upcoming_counts_month"] = _time(
+        lambda: sr.get_daily_upcoming_counts(365, group_by="month"), repeat)
+    results["get_stats"] = _time(sr.get_stats, repeat)
+    results["search_words"] = _time(lambda: [sr.search_words(q, 50) for q in SEARCH_QUERIES], repeat) / len(SEARCH_QUERIES)
+
+    rng = random.Random(7)
+    ids = rng.sample(list(sr.vocabulary), min(reviews, size))
+    started = time.perf_counter()
+    for word_id in ids:
+        sr.review_word(word_id, rng.randint(0, 3))
+    results["review_word"] = (time.perf_counter() - started) / len(ids)
+    sr.storage.close()
+    os.remove(path)
+    return results
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Operations slower than baseline × (1 + tolerance), beyond the noise floor"""
+    regressions = []
+    for size, ops in results["results"].items():
+        for op, seconds in ops.items():
+            before = baseline.get("results", {}).get(size, {}).get(op)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > NOISE_FLOOR:
+                regressions.append({"size": int(size), "op": op, "baseline": before, "current": seconds,
+                                    "ratio": round(seconds / before, 2) if before else None})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the spaced repetition engine on synthetic decks")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated deck sizes (e.g. 1000,10000,100000,1000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query (median is kept)")
+    parser.add_argument("--reviews", type=int, default=20, help="review_word calls per deck")
+    parser.add_argument("--storage", default="json", help="storage backend to load/save through")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": args.storage,
+            "repeat": args.repeat,
+            "unit": "seconds",
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            print(f"benchmarking {size} cards…", file=sys.stderr)
+            results["results"][str(size)] = bench_size(size, args.repeat, args.reviews, args.storage, workdir)
+            for op, seconds in results["results"][str(size)].items():
+                print(f"  {op:<34} {seconds * 1000:10.3f} ms", file=sys.stderr)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["regressions"] = compare(results, baseline, args.tolerance)
+        for r in results["regressions"]:
+            print(f"REGRESSION {r['size']} cards {r['op']}: {r['baseline'] * 1000:.3f} ms → "
+                  f"{r['current'] * 1000:.3f} ms (×{r['ratio']})", file=sys.stderr)
+        exit_code = 1 if results["regressions"] else 0
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Per-user decks, loaded on first use and kept in an LRU of resident decks.
+
+Each (user_id, deck_id) pair is its own SpacedRepetition with its own
+storage, at <root>/<user_id>/<deck_id><ext> (".json" or ".db" depending on
+the backend). A deck is loaded the first time a request asks for it and
+stays resident while it is used. A background thread flushes and closes
+decks that have been idle for `idle_ttl` seconds, and the least recently
+used idle decks once more than `max_decks` decks or `max_cards` cards are
+resident. Decks in use by a request are never evicted, so the caps can be
+exceeded briefly under load.
+
+    with manager.deck("alice", "default") as sr:
+        sr.review_word(word_id, 3)
+
+The optional `default` deck (the original vocabulary.json) is held outside
+the LRU: it is always resident and never evicted.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from spaced_repetition import SpacedRepetition
+from storage import DEFAULT_PATHS
+
+# Ids become directory and file names, so keep them to a safe alphabet
+_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@-]{0,63}$")
+
+DeckKey = Tuple[str, str]
+
+def valid_id(value: str) -> bool:
+    return bool(value) and _ID_RE.match(value) is not None
+
+def deck_path(root: str, user_id: str, deck_id: str, backend: str = "json") -> str:
+    """Storage path of a deck; raises ValueError for unsafe ids"""
+    if not valid_id(user_id) or not valid_id(deck_id):
+        raise ValueError("User and deck ids must be 1-64 letters, digits, '_', '.', '@' or '-'")
+    ext = os.path.splitext(DEFAULT_PATHS[backend])[1]
+    return os.path.join(root, user_id, f"{deck_id}{ext}")
+
+class _Resident:
+    """A deck slot: loaded (deck set) or not, and how many requests hold it"""
+
+    def __init__(self, key: DeckKey):
+        self.key = key
+        self.deck: Optional[SpacedRepetition] = None
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()  # held while loading or closing the deck
+
+class DeckManager:
+    """Lazily loaded per-user decks with idle expiry and an LRU size cap; see the module docstring"""
+
+    def __init__(self, open_deck: Callable[[str, str], SpacedRepetition], max_decks: int = 64,
+                 max_cards: int = 500_000, idle_ttl: float = 900.0, default: Optional[SpacedRepetition] = None,
+                 sweep_interval: float = 30.0):
+        self.open_deck = open_deck
+        self.max_decks = max_decks
+        self.max_cards = max_cards
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.default = default
+        self._decks: "OrderedDict[DeckKey, _Resident]" = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.counters = {"hits": 0, "loads": 0, "load_failures": 0, "expired": 0, "evicted": 0}
+        self._thread = threading.Thread(target=self._sweep_loop, name="deck-sweeper", daemon=True)
+        self._thread.start()
+
+    def acquire(self, user_id: str, deck_id: str) -> SpacedRepetition:
+        """The deck, loading it if needed; pair every call with release()"""
+        key = (user_id, deck_id)
+        with self._lock:
+            entry = self._decks.get(key)
+            if entry is None:
+                entry = self._decks[key] = _Resident(key)
+            self._decks.move_to_end(key)
+            entry.users += 1
+            entry.last_used = time.monotonic()
+        try:
+            # Waits here while another request loads the deck or the sweeper closes it
+            with entry.lock:
+                if entry.deck is not None:
+                    self.counters["hits"] += 1
+                    return entry.deck
+                entry.deck = self.open_deck(user_id, deck_id)
+                self.counters["loads"] += 1
+        except Exception:
+            self.counters["load_failures"] += 1
+            self.release(user_id, deck_id)
+            raise
+        if self._over_capacity():
+            self._wake.set()
+        return entry.deck
+
+    def release(self, user_id: str, deck_id: str):
+        key = (user_id, deck_id)
+        with self._lock:
+            entry = self._decks.get(key)
+            if entry is None:
+                return
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            if entry.users == 0 and entry.deck is None:
+                del self._decks[key]  # a load that failed
+
+    @contextmanager
+    def deck(self, user_id: str, deck_id: str):
+        sr = self.acquire(user_id, deck_id)
+        try:
+            yield sr
+        finally:
+            self.release(user_id, deck_id)
+
+    def resident(self) -> List[SpacedRepetition]:
+        """Every loaded deck, the default one included"""
+        with self._lock:
+            decks = [entry.deck for entry in self._decks.values() if entry.deck is not None]
+        return ([self.default] if self.default is not None else []) + decks
+
+    def _over_capacity(self) -> bool:
+        with self._lock:
+            loaded = [entry.deck for entry in self._decks.values() if entry.deck is not None]
+        return len(loaded) > self.max_decks or sum(len(d.vocabulary) for d in loaded) > self.max_cards
+
+    def _evict(self, entry: _Resident) -> bool:
+        """Flush and close an unused deck; False if a request picked it up meanwhile"""
+        with entry.lock:
+            with self._lock:
+                if entry.users or entry.deck is None:
+                    return False
+                deck, entry.deck = entry.deck, None
+            try:
+                deck.storage.close()  # folds a journal into its snapshot, closes SQLite
+            except Exception as e:
+                print(f"Closing deck {entry.key} failed: {e}")
+        with self._lock:
+            if entry.users == 0 and self._decks.get(entry.key) is entry:
+                del self._decks[entry.key]
+        return True
+
+    def sweep(self):
+        """Evict decks idle for idle_ttl, then least recently used ones until under the caps"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [e for e in self._decks.values() if e.users == 0 and e.deck is not None
+                    and now - e.last_used >= self.idle_ttl]
+        for entry in idle:
+            if self._evict(entry):
+                self.counters["expired"] += 1
+        while self._over_capacity():
+            with self._lock:
+                victim = next((e for e in self._decks.values() if e.users == 0 and e.deck is not None), None)
+            if victim is None:
+                break  # everything resident is in use
+            if self._evict(victim):
+                self.counters["evicted"] += 1
+
+    def _sweep_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Deck sweep failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            loaded = [entry.deck for entry in self._decks.values() if entry.deck is not None]
+            in_use = sum(1 for entry in self._decks.values() if entry.users)
+        return {
+            "resident_decks": len(loaded),
+            "resident_cards": sum(len(d.vocabulary) for d in loaded),
+            "in_use": in_use,
+            "max_decks": self.max_decks,
+            "max_cards": self.max_cards,
+            "idle_ttl": self.idle_ttl,
+            **self.counters,
+        }
+
+    def close(self):
+        """Stop the sweeper and flush every resident deck"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        with self._lock:
+            entries = list(self._decks.values())
+        for entry in entries:
+            if entry.deck is not None:
+                try:
+                    entry.deck.storage.close()
+                except Exception as e:
+                    print(f"Closing deck {entry.key} failed: {e}")
+                entry.deck = None
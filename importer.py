@@ -0,0 +1,106 @@
+"""Streaming bulk import of word lists (CSV, TSV or JSON lines).
+
+CSV/TSV files may start with a header naming the columns (word, translation,
+example, word_type, notes); without one the columns are taken in that order.
+JSONL files hold one {"word": ..., "translation": ...} object per line.
+Rows are read one at a time, so memory stays flat however long the file is.
+
+Usage (stop the server first when using the JSON storage backend, or use
+POST /api/sr/words/import instead, so two processes don't write the deck):
+
+    python importer.py words.csv
+    python importer.py words.tsv --storage sqlite --data-file vocabulary.db
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import IO, Dict, Iterator, Optional
+
+IMPORT_COLUMNS = ("word", "translation", "example", "word_type", "notes")
+FORMATS = ("csv", "tsv", "jsonl")
+
+# csv's default 128 KiB field cap is too small for long notes
+csv.field_size_limit(16 * 1024 * 1024)
+
+def detect_format(filename: str) -> Optional[str]:
+    """Import format from a file extension, or None if unrecognised"""
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return {"csv": "csv", "tsv": "tsv", "tab": "tsv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(ext)
+
+def _iter_delimited(stream: IO[str], delimiter: str) -> Iterator[Dict]:
+    reader = csv.reader(stream, delimiter=delimiter)
+    columns = IMPORT_COLUMNS
+    for line_no, values in enumerate(reader):
+        if not values or not any(v.strip() for v in values):
+            continue
+        if line_no == 0:
+            header = [v.strip().lower() for v in values]
+            if "word" in header and "translation" in header:
+                columns = tuple(header)
+                continue
+        yield dict(zip(columns, values))
+
+def _iter_jsonl(stream: IO[str]) -> Iterator[Dict]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None  # counted as invalid by add_words
+        yield row if isinstance(row, dict) else {}
+
+def iter_rows(stream: IO[str], fmt: str) -> Iterator[Dict]:
+    """Lazily parse an import stream into row dicts"""
+    if fmt == "csv":
+        return _iter_delimited(stream, ",")
+    if fmt == "tsv":
+        return _iter_delimited(stream, "\t")
+    if fmt == "jsonl":
+        return _iter_jsonl(stream)
+    raise ValueError(f"Unknown import format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+def text_stream(binary: IO[bytes]) -> IO[str]:
+    """Wrap a byte stream for iter_rows (UTF-8, BOM tolerated, newlines left to csv)"""
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", errors="replace", newline="")
+
+def main():
+    from spaced_repetition import SpacedRepetition
+    from storage import open_storage
+
+    parser = argparse.ArgumentParser(description="Bulk-import words into the vocabulary")
+    parser.add_argument("path", help="CSV, TSV or JSONL file ('-' for stdin)")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--storage", default=os.getenv("SR_STORAGE", "json"), help="json, sqlite or journal")
+    parser.add_argument("--data-file", default=os.getenv("SR_DATA_FILE"))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--allow-duplicates", action="store_true", help="import words already in the deck")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if not fmt:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    sr = SpacedRepetition(storage=open_storage(args.storage, args.data_file))
+
+    def report(summary):
+        print(f"\r{summary['processed']} rows | {summary['added']} added | "
+              f"{summary['duplicates']} duplicates | {summary['invalid']} invalid", end="", file=sys.stderr)
+
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        summary = sr.add_words(iter_rows(text_stream(source), fmt), batch_size=args.batch_size,
+                               skip_duplicates=not args.allow_duplicates, progress=report)
+    finally:
+        source.close()
+        sr.storage.close()
+    print(file=sys.stderr)
+    for error in summary["errors"]:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Open-loop load driver for the Flask app.
+
+Replays a weighted mix of /api/chat, /api/sr/review, /api/sr/stats,
+/api/sr/due and /api/sr/ai-translate at a target request rate and reports
+throughput and p50/p95/p99 latency per endpoint. Requests are fired on
+schedule whether or not earlier ones have finished, and latency is measured
+from the scheduled start, so a saturated server shows up as growing
+latency instead of a quietly lower request rate.
+
+Against a server that is already running:
+
+    python loadtest/driver.py --url http://127.0.0.1:5000 --rps 20 --duration 60
+
+Or let the driver start the stand-ins (loadtest/stubs.py) and the app itself,
+once per configuration, and compare them:
+
+    python loadtest/driver.py --launch dev --launch gunicorn:2x8 --launch gunicorn:4x4 --rps 30
+
+"gunicorn:WxT" runs `gunicorn -k gthread -w W --threads T` (gunicorn must be installed).
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stubs import GoogleStub, OllamaStub, StubConfig, serve  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "chat=1,review=4,stats=2,due=2,translate=2"
+PERCENTILES = (50, 95, 99)
+
+_SEED_WORDS = ("casa", "cane", "gatto", "mangiare", "parlare", "bello", "amico", "libro", "acqua", "tempo",
+               "giorno", "notte", "strada", "città", "scuola", "lavoro", "mare", "sole", "luna", "fiore")
+_MESSAGES = ("Ciao, come stai?", "Cosa mangi oggi?", "Dove vai?", "Parliamo della casa.", "Che tempo fa?")
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --mix: {', '.join(sorted(unknown))} (known: {', '.join(ENDPOINTS)})")
+    return mix
+
+class Target:
+    """The app under test plus the state the traffic needs (word ids, session ids)"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.http = requests.Session()
+        self.http.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=512))
+        self.word_ids: List[str] = []
+
+    def seed(self, count: int):
+        """Add `count` words so reviews have something to hit"""
+        for i in range(count):
+            word = f"{_SEED_WORDS[i % len(_SEED_WORDS)]}{i // len(_SEED_WORDS) or ''}"
+            r = self.http.post(f"{self.url}/api/sr/words", json={"word": word, "translation": f"{word}-en"}, timeout=30)
+            if r.ok:
+                self.word_ids.append(r.json()["word"]["id"])
+        if not self.word_ids:
+            r = self.http.get(f"{self.url}/api/sr/words?fields=id", timeout=30)
+            self.word_ids = [w["id"] for w in r.json().get("words", [])]
+
+def _chat(t: Target, rng: random.Random):
+    return t.http.post(f"{t.url}/api/chat", json={"message": rng.choice(_MESSAGES), "strict_mode": rng.random() < 0.5,
+                                                  "session_id": f"load-{rng.randrange(50)}"}, timeout=120)
+
+def _review(t: Target, rng: random.Random):
+    return t.http.post(f"{t.url}/api/sr/review", json={"word_id": rng.choice(t.word_ids), "quality": rng.randint(0, 3)},
+                       timeout=60)
+
+def _stats(t: Target, rng: random.Random):
+    return t.http.get(f"{t.url}/api/sr/stats", timeout=60)
+
+def _due(t: Target, rng: random.Random):
+    return t.http.get(f"{t.url}/api/sr/due", timeout=60)
+
+def _translate(t: Target, rng: random.Random):
+    # A few hundred distinct words, so the translation cache sees hits and misses
+    word = f"{rng.choice(_SEED_WORDS)}{rng.randrange(25)}"
+    return t.http.post(f"{t.url}/api/sr/ai-translate", json={"word": word}, timeout=60)
+
+ENDPOINTS = {"chat": _chat, "review": _review, "stats": _stats, "due": _due, "translate": _translate}
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def run_load(target: Target, mix: Dict[str, float], rps: float, duration: float, max_in_flight: int,
+             seed: int = 1) -> Dict:
+    """Fire requests at `rps` for `duration` seconds; returns per-endpoint results"""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples: Dict[str, List[float]] = {n: [] for n in names}
+    errors: Dict[str, Dict[str, int]] = {n: {} for n in names}
+    lock = threading.Lock()
+
+    def fire(name: str, scheduled: float, req_rng: random.Random):
+        try:
+            r = ENDPOINTS[name](target, req_rng)
+            outcome = None if r.status_code < 400 else str(r.status_code)
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with lock:
+            if outcome is None:
+                samples[name].append(latency)
+            else:
+                errors[name][outcome] = errors[name].get(outcome, 0) + 1
+
+    total = int(rps * duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, rng.choices(names, weights)[0], scheduled, random.Random(rng.random()))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        values = sorted(samples[name])
+        failed = sum(errors[name].values())
+        results[name] = {
+            "requests": len(values) + failed,
+            "ok": len(values),
+            "errors": errors[name],
+            "throughput_rps": round(len(values) / elapsed, 2),
+            **{f"p{p}_ms": round(_percentile(values, p) * 1000, 1) for p in PERCENTILES},
+            "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+        }
+    return {"elapsed_seconds": round(elapsed, 2), "target_rps": rps, "endpoints": results}
+
+def print_report(label: str, report: Dict):
+    print(f"\n== {label}: {report['target_rps']} rps target, {report['elapsed_seconds']}s ==")
+    print(f"{'endpoint':<10} {'reqs':>6} {'ok':>6} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  errors")
+    for name, r in report["endpoints"].items():
+        errors = ", ".join(f"{k}×{v}" for k, v in r["errors"].items()) or "-"
+        print(f"{name:<10} {r['requests']:>6} {r['ok']:>6} {r['throughput_rps']:>7} {r['p50_ms']:>9} "
+              f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}  {errors}")
+
+def launch_app(config: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Start the app as `dev` (Flask's threaded server) or `gunicorn:WxT`"""
+    if config == "dev":
+        cmd = [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    elif config.startswith("gunicorn:"):
+        workers, _, threads = config.split(":", 1)[1].partition("x")
+        cmd = [sys.executable, "-m", "gunicorn", "-k", "gthread", "-w", workers or "2", "--threads", threads or "8",
+               "-b", f"127.0.0.1:{port}", "app:app"]
+    else:
+        raise SystemExit(f"unknown --launch config: {config} (use dev or gunicorn:WxT)")
+    proc = subprocess.Popen(cmd, cwd=REPO, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{config}: app exited with status {proc.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/api/test", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"{config}: app did not start within 30s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app with a realistic traffic mix")
+    parser.add_argument("--url", help="app already running at this URL")
+    parser.add_argument("--launch", action="append", default=[], help="start the app: dev or gunicorn:WxT (repeatable)")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--seed-words", type=int, default=200, help="words added before the run")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="client-side concurrency cap")
+    parser.add_argument("--output", help="write all reports as JSON here")
+    parser.add_argument("--ttft", type=float, default=0.2, help="stand-in Ollama time to first token (s)")
+    parser.add_argument("--token-rate", type=float, default=30.0, help="stand-in Ollama tokens/s")
+    parser.add_argument("--ollama-error-rate", type=float, default=0.0)
+    parser.add_argument("--google-latency", type=float, default=0.05)
+    parser.add_argument("--google-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    if not args.url and not args.launch:
+        parser.error("pass --url or at least one --launch")
+    mix = parse_mix(args.mix)
+
+    reports = {}
+    if args.url:
+        target = Target(args.url)
+        target.seed(args.seed_words)
+        reports[args.url] = run_load(target, mix, args.rps, args.duration, args.max_in_flight)
+        print_report(args.url, reports[args.url])
+
+    if args.launch:
+        config = StubConfig(args.ttft, args.token_rate, 24, args.ollama_error_rate,
+                            args.google_latency, args.google_error_rate)
+        ollama_port, google_port = _free_port(), _free_port()
+        stubs = [serve(OllamaStub, ollama_port, config), serve(GoogleStub, google_port, config)]
+        try:
+            for launch in args.launch:
+                workdir = tempfile.mkdtemp(prefix="sr-load-")
+                port = _free_port()
+                proc = launch_app(launch, port, {
+                    "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+                    "GOOGLE_TRANSLATE_URL": f"http://127.0.0.1:{google_port}/translate_a/single",
+                    "SR_DATA_FILE": os.path.join(workdir, "vocabulary.json"),
+                    "TRANSLATION_CACHE_PATH": os.path.join(workdir, "translations.db"),
+                    "DEBUG_LOGS": "0",
+                })
+                try:
+                    target = Target(f"http://127.0.0.1:{port}")
+                    target.seed(args.seed_words)
+                    reports[launch] = run_load(target, mix, args.rps, args.duration, args.max_in_flight)
+                    print_report(launch, reports[launch])
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=10)
+                    shutil.rmtree(workdir, ignore_errors=True)
+        finally:
+            for server in stubs:
+                server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == "__main__":
+    main()
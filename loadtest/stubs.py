@@ -0,0 +1,138 @@
+"""Local stand-ins for Ollama and Google Translate, for load tests without the network.
+
+The Ollama stand-in serves /api/chat (streaming or not) at a configurable
+time-to-first-token and token rate, and /api/ps. The Google stand-in serves
+/translate_a/single in the same JSON shape as translate.googleapis.com.
+Both fail a configurable fraction of requests with HTTP 500.
+
+    python loadtest/stubs.py --ollama-port 11435 --google-port 8089 --token-rate 40 --ttft 0.15
+
+Point the app at them with
+    OLLAMA_BASE_URL=http://127.0.0.1:11435
+    GOOGLE_TRANSLATE_URL=http://127.0.0.1:8089/translate_a/single
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_REPLY_WORDS = ("ciao", "come", "stai", "bene", "grazie", "oggi", "molto", "bello", "amico", "casa",
+                "mangiare", "parlare", "dove", "quando", "sempre", "anche", "tempo", "giorno")
+
+class StubConfig:
+    def __init__(self, ttft: float = 0.2, token_rate: float = 30.0, reply_tokens: int = 24,
+                 ollama_error_rate: float = 0.0, google_latency: float = 0.05, google_error_rate: float = 0.0):
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.ollama_error_rate = ollama_error_rate
+        self.google_latency = google_latency
+        self.google_error_rate = google_error_rate
+
+class _Handler(BaseHTTPRequestHandler):
+    config: StubConfig = StubConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class OllamaStub(_Handler):
+    resident = []
+
+    def do_GET(self):
+        if self.path.startswith("/api/ps"):
+            return self._json(200, {"models": [{"name": m} for m in self.resident]})
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.startswith("/api/chat"):
+            return self._json(404, {"error": "not found"})
+        cfg = self.config
+        if random.random() < cfg.ollama_error_rate:
+            return self._json(500, {"error": "stub failure"})
+        if body.get("model") and body["model"] not in self.resident:
+            self.resident.append(body["model"])
+        limit = (body.get("options") or {}).get("num_predict") or cfg.reply_tokens
+        tokens = [(" " if i else "") + random.choice(_REPLY_WORDS) for i in range(min(limit, cfg.reply_tokens))]
+        delay = 1.0 / cfg.token_rate if cfg.token_rate > 0 else 0.0
+        time.sleep(cfg.ttft)
+        if not body.get("stream", True):
+            time.sleep(delay * len(tokens))
+            return self._json(200, {"model": body.get("model"), "message": {"role": "assistant", "content": "".join(tokens)},
+                                    "done": True, "eval_count": len(tokens), "eval_duration": int(delay * len(tokens) * 1e9)})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._chunk({"model": body.get("model"), "message": {"role": "assistant", "content": token}, "done": False})
+                time.sleep(delay)
+            self._chunk({"model": body.get("model"), "message": {"role": "assistant", "content": ""}, "done": True,
+                         "eval_count": len(tokens), "eval_duration": int(delay * len(tokens) * 1e9)})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled the generation
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+class GoogleStub(_Handler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("/translate_a/single"):
+            return self._json(404, {"error": "not found"})
+        cfg = self.config
+        time.sleep(cfg.google_latency)
+        if random.random() < cfg.google_error_rate:
+            return self._json(500, {"error": "stub failure"})
+        word = (parse_qs(url.query).get("q") or [""])[0]
+        self._json(200, [[[f"{word}-en", word, None, None, 10]], None, "it", None, None, None, 1.0, [], [["it"]]])
+
+def serve(handler, port: int, config: StubConfig) -> ThreadingHTTPServer:
+    """Start a stand-in server on a background thread"""
+    handler = type(handler.__name__, (handler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Ollama and Google Translate servers")
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    parser.add_argument("--google-port", type=int, default=8089)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=30.0, help="tokens per second after the first")
+    parser.add_argument("--reply-tokens", type=int, default=24)
+    parser.add_argument("--ollama-error-rate", type=float, default=0.0)
+    parser.add_argument("--google-latency", type=float, default=0.05)
+    parser.add_argument("--google-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = StubConfig(args.ttft, args.token_rate, args.reply_tokens, args.ollama_error_rate,
+                        args.google_latency, args.google_error_rate)
+    serve(OllamaStub, args.ollama_port, config)
+    serve(GoogleStub, args.google_port, config)
+    print(f"Ollama stand-in on http://127.0.0.1:{args.ollama_port}, "
+          f"Google stand-in on http://127.0.0.1:{args.google_port}/translate_a/single")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
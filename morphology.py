@@ -0,0 +1,262 @@
+"""Rule-based Italian inflection for known-word matching.
+
+A learner who knows "parlare" should not have "parlo" or "parliamo" flagged
+as new, and one who knows "amico" should be fine with "amici". `expand`
+turns a dictionary form into its regular inflections using suffix tables
+(verb conjugations with their spelling changes, noun plurals, adjective
+gender and number, infinitive/gerund + clitic pronouns) plus a short table
+of common irregular verbs. The word type picks the tables; entries without
+one are treated as verbs when they look like an infinitive and as nouns
+otherwise. Everything is computed offline from the word itself.
+
+`KnownWordMatcher` keeps the expanded forms of a whole vocabulary in one
+refcounted hash table, updated incrementally as words are added or removed,
+so checking a token is a single lookup.
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, Set, Tuple
+
+_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ']+", re.UNICODE)
+
+# Endings per conjugation, appended to the stem (infinitive minus -are/-ere/-ire)
+_VERB_ENDINGS: Dict[str, Tuple[str, ...]] = {
+    "are": (
+        "are", "ar", "o", "i", "a", "iamo", "ate", "ano",                      # infinitive, present
+        "avo", "avi", "ava", "avamo", "avate", "avano",                        # imperfect
+        "erò", "erai", "erà", "eremo", "erete", "eranno",                      # future
+        "erei", "eresti", "erebbe", "eremmo", "ereste", "erebbero",            # conditional
+        "ino", "iate",                                                         # subjunctive
+        "assi", "asse", "assimo", "aste", "assero",                            # imperfect subjunctive
+        "ai", "asti", "ò", "ammo", "arono",                                    # past historic
+        "ato", "ata", "ati", "ate", "ando", "ante", "anti",                     # participles, gerund
+    ),
+    "ere": (
+        "ere", "er", "o", "i", "e", "iamo", "ete", "ono",
+        "evo", "evi", "eva", "evamo", "evate", "evano",
+        "erò", "erai", "erà", "eremo", "erete", "eranno",
+        "erei", "eresti", "erebbe", "eremmo", "ereste", "erebbero",
+        "a", "ano", "iate",
+        "essi", "esse", "essimo", "este", "essero",
+        "ei", "etti", "esti", "é", "è", "ette", "emmo", "erono", "ettero",
+        "uto", "uta", "uti", "ute", "endo", "ente", "enti",
+    ),
+    "ire": (
+        "ire", "ir", "iamo", "ite",                                            # present: see _IRE_PRESENT
+        "ivo", "ivi", "iva", "ivamo", "ivate", "ivano",
+        "irò", "irai", "irà", "iremo", "irete", "iranno",
+        "irei", "iresti", "irebbe", "iremmo", "ireste", "irebbero",
+        "iate",
+        "issi", "isse", "issimo", "iste", "issero",
+        "ii", "isti", "ì", "immo", "irono",
+        "ito", "ita", "iti", "ite", "endo", "ente", "enti",
+    ),
+}
+
+# Present indicative/subjunctive of -ire verbs: plain (dormo, dorma) or with -isc- (finisco, finisca),
+# never both, so "finire" doesn't claim "fine" and "fina"
+_IRE_PRESENT = ("o", "i", "e", "ono", "a", "ano")
+_ISC_PRESENT = ("isco", "isci", "isce", "iscono", "isca", "iscano")
+
+# -ire verbs (and their compounds: consentire, scoprire) conjugated without -isc-; the rest take it
+_PLAIN_IRE = ("dormire", "partire", "sentire", "aprire", "coprire", "offrire", "soffrire", "seguire",
+              "servire", "vestire", "fuggire", "bollire", "cucire", "mentire", "pentire", "vertire",
+              "avvertire", "divertire", "investire", "salire", "udire", "morire", "venire", "uscire")
+
+# Pronouns that attach to infinitives, gerunds and imperatives (parlarti, dicendolo)
+_CLITICS = ("mi", "ti", "ci", "vi", "si", "lo", "la", "li", "le", "ne", "gli", "glielo", "gliela", "glieli",
+            "gliele", "gliene", "melo", "tela", "celo", "sene")
+
+# Common irregular verbs: the forms the regular tables miss
+_IRREGULAR: Dict[str, Tuple[str, ...]] = {
+    "essere": ("sono", "sei", "è", "siamo", "siete", "ero", "eri", "era", "eravamo", "eravate", "erano",
+               "sarò", "sarai", "sarà", "saremo", "sarete", "saranno", "sarei", "saresti", "sarebbe",
+               "saremmo", "sareste", "sarebbero", "sia", "siano", "fossi", "fosse", "fossimo", "foste",
+               "fossero", "fui", "fu", "fummo", "furono", "stato", "stata", "stati", "state", "essendo"),
+    "avere": ("ho", "hai", "ha", "abbiamo", "avete", "hanno", "avrò", "avrai", "avrà", "avremo", "avrete",
+              "avranno", "avrei", "avresti", "avrebbe", "avremmo", "avreste", "avrebbero", "abbia",
+              "abbiate", "abbiano", "ebbi", "ebbe", "ebbero"),
+    "fare": ("faccio", "fai", "fa", "facciamo", "fate", "fanno", "facevo", "facevi", "faceva", "facevamo",
+             "facevate", "facevano", "farò", "farai", "farà", "faremo", "farete", "faranno", "farei",
+             "faresti", "farebbe", "faremmo", "fareste", "farebbero", "faccia", "facciano", "feci",
+             "fece", "fecero", "fatto", "fatta", "fatti", "fatte", "facendo"),
+    "andare": ("vado", "vai", "va", "vanno", "andrò", "andrai", "andrà", "andremo", "andrete", "andranno",
+               "andrei", "andresti", "andrebbe", "vada", "vadano"),
+    "stare": ("sto", "stai", "sta", "stanno", "starò", "starai", "starà", "stia", "stiano", "stetti",
+              "stette", "stettero"),
+    "dare": ("do", "dai", "dà", "danno", "darò", "darai", "darà", "dia", "diano", "diedi", "diede",
+             "diedero", "detti", "dette"),
+    "dire": ("dico", "dici", "dice", "diciamo", "dite", "dicono", "dicevo", "diceva", "dicevano", "dirò",
+             "dirai", "dirà", "direi", "direbbe", "dica", "dicano", "dissi", "disse", "dissero", "detto",
+             "detta", "detti", "dette", "dicendo"),
+    "venire": ("vengo", "vieni", "viene", "veniamo", "venite", "vengono", "verrò", "verrai", "verrà",
+               "verremo", "verrete", "verranno", "verrei", "verrebbe", "venga", "vengano", "venni",
+               "venne", "vennero", "venuto", "venuta", "venuti", "venute"),
+    "volere": ("voglio", "vuoi", "vuole", "vogliamo", "volete", "vogliono", "vorrò", "vorrai", "vorrà",
+               "vorrei", "vorresti", "vorrebbe", "vorremmo", "vorreste", "vorrebbero", "voglia",
+               "vogliano", "volli", "volle", "vollero"),
+    "potere": ("posso", "puoi", "può", "possiamo", "potete", "possono", "potrò", "potrai", "potrà",
+               "potrei", "potresti", "potrebbe", "potremmo", "potreste", "potrebbero", "possa", "possano"),
+    "dovere": ("devo", "devi", "deve", "dobbiamo", "dovete", "devono", "dovrò", "dovrai", "dovrà",
+               "dovrei", "dovresti", "dovrebbe", "dovremmo", "dovreste", "dovrebbero", "debba", "debbano"),
+    "sapere": ("so", "sai", "sa", "sappiamo", "sapete", "sanno", "saprò", "saprai", "saprà", "saprei",
+               "saprebbe", "sappia", "sappiano", "seppi", "seppe", "seppero"),
+    "uscire": ("esco", "esci", "esce", "escono", "esca", "escano"),
+    "bere": ("bevo", "bevi", "beve", "beviamo", "bevete", "bevono", "bevevo", "beveva", "berrò", "berrà",
+             "berrei", "beva", "bevuto", "bevendo"),
+    "tenere": ("tengo", "tieni", "tiene", "teniamo", "tenete", "tengono", "terrò", "terrà", "terrei",
+               "tenga", "tengano", "tenni", "tenne"),
+    "rimanere": ("rimango", "rimani", "rimane", "rimangono", "rimarrò", "rimarrà", "rimanga", "rimasto",
+                 "rimasta", "rimasti", "rimaste"),
+    "scegliere": ("scelgo", "scegli", "sceglie", "scelgono", "scelga", "scelsi", "scelse", "scelto",
+                  "scelta", "scelti", "scelte"),
+    "piacere": ("piaccio", "piaci", "piace", "piacciamo", "piacciono", "piaccia", "piacque", "piaciuto",
+                "piaciuta"),
+    "morire": ("muoio", "muori", "muore", "muoiono", "muoia", "morto", "morta", "morti", "morte"),
+    "nascere": ("nacqui", "nacque", "nacquero", "nato", "nata", "nati", "nate"),
+}
+
+# Irregular forms that look like nouns or adjectives (sono, era) but aren't
+_IRREGULAR_FORMS = frozenset(form for forms in _IRREGULAR.values() for form in forms)
+
+_ELIDABLE_VOWELS = ("o", "a", "e", "i")
+
+_INFLECTED_TYPES = ("verb", "noun", "adjective")
+
+def _join(stem: str, ending: str, infinitive: str) -> str:
+    """Stem + ending with the regular spelling changes (cerchiamo, mangiamo, studi)"""
+    if ending[:1] in ("i", "e", "è", "é") and infinitive.endswith(("care", "gare")):
+        return stem + "h" + ending
+    if stem.endswith("i") and ending[:1] in ("i", "ì"):
+        return stem + ending[1:] if len(ending) > 1 else stem
+    if stem.endswith(("ci", "gi")) and ending[:1] in ("e", "è", "é") and infinitive.endswith("are"):
+        return stem[:-1] + ending
+    return stem + ending
+
+def _verb_forms(verb: str) -> Set[str]:
+    forms = set(_IRREGULAR.get(verb, ()))
+    ending = verb[-3:]
+    stem = verb[:-3]
+    if ending not in _VERB_ENDINGS or len(stem) < 2 or verb == "essere":
+        return forms
+    forms.update(_join(stem, e, verb) for e in _VERB_ENDINGS[ending])
+    if ending == "ire":
+        present = _IRE_PRESENT if verb.endswith(_PLAIN_IRE) else _ISC_PRESENT
+        forms.update(_join(stem, e, verb) for e in present)
+    # Infinitive (final -e dropped) and gerund take enclitic pronouns
+    gerund = _join(stem, "ando" if ending == "are" else "endo", verb)
+    for base in (verb[:-1], gerund):
+        forms.update(base + clitic for clitic in _CLITICS)
+    return forms
+
+def _noun_plurals(word: str) -> Set[str]:
+    """Plural of a noun (amico → amici, amica → amiche, chiave → chiavi)"""
+    stem, last = word[:-1], word[-1]
+    if last == "o":
+        if stem.endswith("g"):
+            return {stem + "hi"}  # lago → laghi
+        return {stem} if stem.endswith("i") else {stem + "i"}  # negozio → negozi
+    if last == "a":
+        if stem.endswith(("c", "g")):
+            return {stem + "he"}  # amica → amiche
+        forms = {stem + "e"}
+        if stem.endswith(("ci", "gi")):
+            forms.add(stem[:-1] + "e")  # arancia → arance
+        if word.endswith(("ema", "gramma", "ista")):
+            forms.add(stem + "i")  # problema → problemi, artista → artisti
+        return forms
+    if last == "e":
+        return {stem + "i"}
+    return set()  # -i and consonant endings don't change (crisi, film)
+
+def _adjective_forms(word: str) -> Set[str]:
+    """Gender, number and -issimo forms of an adjective (bianco → bianca, bianchi, bianche, bianchissimo)"""
+    stem, last = word[:-1], word[-1]
+    hard = stem + "h" if stem.endswith(("c", "g")) else stem  # bianche, lunghe
+    if last == "o":
+        base = stem[:-1] if stem.endswith("i") else stem  # vecchio → vecchi, vecchissimo
+        # -co/-go keep the hard sound in the masculine plural too, except the unstressed -ico (simpatici)
+        plural = stem if word.endswith("ico") else hard if hard != stem else base
+        forms = {stem + "a", hard + "e", plural + "i"}
+        if stem.endswith(("ci", "gi")):
+            forms.add(stem[:-1] + "e")  # grigio → grige
+        superlative = plural
+    elif last == "a":
+        forms = {stem + "i", hard + "e"}  # entusiasta → entusiasti, entusiaste
+        superlative = hard
+    elif last == "e":
+        forms = {stem + "i"}
+        superlative = stem
+    else:
+        return set()
+    if len(stem) >= 3:
+        forms.update(superlative + s for s in ("issimo", "issima", "issimi", "issime"))
+    return forms
+
+def _nominal_forms(word: str, word_type: str) -> Set[str]:
+    """Plural of a noun, or every gender/number form of an adjective"""
+    if len(word) < 4 or word.endswith(("à", "ù", "è", "ì", "ò")):
+        return set()  # short function words (che, con) and stressed endings (città, virtù) don't inflect
+    return _adjective_forms(word) if word_type == "adjective" else _noun_plurals(word)
+
+def _guess_type(token: str) -> str:
+    """verb or noun, for entries saved without a word type"""
+    if token in _IRREGULAR_FORMS or (len(token) > 4 and token.endswith(tuple(_VERB_ENDINGS))):
+        return "verb"
+    return "noun"
+
+def expand(word: str, word_type: str = "") -> Set[str]:
+    """All forms of a vocabulary entry that count as known (lowercase).
+    Multi-word entries contribute each of their words."""
+    forms = set()
+    word_type = (word_type or "").strip().lower()
+    for token in _WORD_RE.findall((word or "").lower().replace("’", "'")):
+        forms.add(token)
+        kind = word_type
+        if token.endswith(("arsi", "ersi", "irsi")):
+            token = token[:-2] + "e"  # chiamarsi → chiamare
+            forms.add(token)
+            kind = kind or "verb"
+        kind = kind or _guess_type(token)
+        if kind == "verb":
+            forms |= _verb_forms(token)
+        elif kind in _INFLECTED_TYPES:
+            forms |= _nominal_forms(token, kind)
+    return forms
+
+class KnownWordMatcher:
+    """Set-like lookup of every inflected form of a vocabulary, with incremental updates.
+    Supports `token in matcher`, so it can stand in for a plain set of known words."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        self._forms: Counter = Counter()
+        for word, word_type in entries:
+            self.add(word, word_type)
+
+    def __len__(self) -> int:
+        return len(self._forms)
+
+    def add(self, word: str, word_type: str = ""):
+        self._forms.update(expand(word, word_type))
+
+    def remove(self, word: str, word_type: str = ""):
+        forms = self._forms
+        for form in expand(word, word_type):
+            count = forms.get(form, 0)
+            if count <= 1:
+                forms.pop(form, None)
+            else:
+                forms[form] = count - 1
+
+    def __contains__(self, token: str) -> bool:
+        token = token.replace("’", "'")
+        if token in self._forms:
+            return True
+        if "'" not in token:
+            return False
+        # Elisions: l'amico, dell'acqua, un'idea — every part must be known
+        *elided, last = token.split("'")
+        if last and last not in self._forms:
+            return False
+        return all(not part or any(part + v in self._forms for v in _ELIDABLE_VOWELS) or part in self._forms
+                   for part in elided)
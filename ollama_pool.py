@@ -0,0 +1,205 @@
+"""A pool of Ollama hosts with least-loaded routing and model residency tracking.
+
+Hosts come from OLLAMA_HOSTS (comma-separated URLs) or OLLAMA_HOSTS_FILE (one
+URL per line, # comments allowed), falling back to OLLAMA_BASE_URL. Each call
+leases a host:
+
+    with pool.lease(session_id) as host:
+        SESSION.post(f"{host.url}/api/chat", ...)
+
+Chat sessions stick to the host that served them last, while it stays
+healthy, so the model's cached prompt stays useful. Everything else goes to
+the healthy host with the fewest calls in flight, preferring hosts that
+already have the model loaded. A background thread polls each host's
+/api/ps for health and resident models and warms the model on any healthy
+host that has unloaded it. Set `call_guard` to wrap those warm-up calls the
+way the app wraps its own (admission control, timing):
+
+    pool.call_guard = lambda kind: admission.slot(kind)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional
+
+import requests
+
+PROBE_TIMEOUT = (2, 5)
+WARM_KIND = "warm"  # call kind passed to call_guard for warm-ups
+MAX_AFFINITY = 10000  # remembered session → host pairs
+
+def load_hosts(default: str = "http://localhost:11434") -> List[str]:
+    """Host URLs from OLLAMA_HOSTS, OLLAMA_HOSTS_FILE or the single default"""
+    urls = [u for u in os.getenv("OLLAMA_HOSTS", "").split(",") if u.strip()]
+    path = os.getenv("OLLAMA_HOSTS_FILE")
+    if not urls and path:
+        with open(path, encoding="utf-8") as f:
+            urls = [line.split("#", 1)[0] for line in f]
+    urls = [u.strip().rstrip("/") for u in urls if u.strip()]
+    return list(dict.fromkeys(urls)) or [default.rstrip("/")]
+
+class OllamaHost:
+    """Load and health of one Ollama endpoint"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.healthy = True  # optimistic until the first probe says otherwise
+        self.resident_models: List[str] = []
+        self.latency = 0.0  # EWMA of request seconds
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[float] = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "resident_models": self.resident_models,
+            "latency_seconds": round(self.latency, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_probe": self.last_probe,
+        }
+
+class OllamaPool:
+    """Routes Ollama calls across hosts; see the module docstring"""
+
+    def __init__(self, urls: List[str], model: str, session: Optional[requests.Session] = None,
+                 probe_interval: float = 30.0, keep_alive: str = "24h"):
+        self.hosts = [OllamaHost(url) for url in urls]
+        self.model = model
+        self.session = session or requests.Session()
+        self.probe_interval = probe_interval
+        self.keep_alive = keep_alive
+        self._affinity: "OrderedDict[str, OllamaHost]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # call_guard(kind) -> context manager held around each warm-up request
+        self.call_guard: Optional[Callable[[str], ContextManager]] = None
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def _score(self, host: OllamaHost):
+        return (host.in_flight, self.model not in host.resident_models, host.latency)
+
+    def pick(self, session_id: Optional[str] = None) -> OllamaHost:
+        """Host for the next call (does not count it as in flight; use lease for that)"""
+        with self._lock:
+            if session_id is not None:
+                host = self._affinity.get(session_id)
+                if host is not None and host.healthy:
+                    self._affinity.move_to_end(session_id)
+                    return host
+            candidates = [h for h in self.hosts if h.healthy] or self.hosts
+            host = min(candidates, key=self._score)
+            if session_id is not None:
+                self._affinity[session_id] = host
+                self._affinity.move_to_end(session_id)
+                while len(self._affinity) > MAX_AFFINITY:
+                    self._affinity.popitem(last=False)
+            return host
+
+    @contextmanager
+    def lease(self, session_id: Optional[str] = None):
+        """Pick a host and count the call against it; connection failures mark it unhealthy"""
+        host = self.pick(session_id)
+        with self._lock:
+            host.in_flight += 1
+            host.requests += 1
+        started = time.monotonic()
+        try:
+            yield host
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            with self._lock:
+                host.failures += 1
+                host.healthy = False
+                host.last_error = str(e)
+            raise
+        finally:
+            with self._lock:
+                host.in_flight -= 1
+                host.latency = 0.8 * host.latency + 0.2 * (time.monotonic() - started)
+
+    def probe(self, host: OllamaHost):
+        """Refresh a host's health and resident models; warm the model if it was unloaded"""
+        try:
+            r = self.session.get(f"{host.url}/api/ps", timeout=PROBE_TIMEOUT)
+            r.raise_for_status()
+            models = [m.get("name") or m.get("model") for m in (r.json().get("models") or [])]
+            with self._lock:
+                host.healthy = True
+                host.resident_models = [m for m in models if m]
+                host.last_error = None
+                host.last_probe = time.time()
+        except Exception as e:
+            with self._lock:
+                host.healthy = False
+                host.last_error = str(e)
+                host.last_probe = time.time()
+            return
+        if self.model not in host.resident_models:
+            self.warm(host)
+
+    def warm(self, host: OllamaHost):
+        """Load the model on a host with a one-token request, inside call_guard when set"""
+        guard = self.call_guard(WARM_KIND) if self.call_guard is not None else nullcontext()
+        try:
+            with guard:
+                self.session.post(f"{host.url}/api/chat", json={
+                    "model": self.model,
+                    "messages": [{"role": "user", "content": "."}],
+                    "options": {"num_predict": 1},
+                    "keep_alive": self.keep_alive,
+                    "stream": False,
+                }, timeout=(5, 60))
+        except requests.exceptions.RequestException as e:
+            with self._lock:
+                host.last_error = str(e)
+            return
+        except Exception as e:
+            # Turned away by the guard (e.g. the admission queue is full): not the host's fault,
+            # the next probe tries again
+            print(f"Warming {host.url} skipped: {e}")
+            return
+        with self._lock:
+            if self.model not in host.resident_models:
+                host.resident_models.append(self.model)
+
+    def probe_all(self):
+        for host in self.hosts:
+            self.probe(host)
+
+    def start(self, delay: float = 0.5):
+        """Start the background probe/warm loop (first round after `delay` seconds)"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            if self._stop.wait(delay):
+                return
+            while True:
+                self.probe_all()
+                if self._stop.wait(self.probe_interval):
+                    return
+
+        self._thread = threading.Thread(target=loop, name="ollama-pool-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "model": self.model,
+                "hosts": [host.snapshot() for host in self.hosts],
+                "sessions_pinned": len(self._affinity),
+            }
@@ -0,0 +1,137 @@
+"""Opt-in sampling profiler for individual requests.
+
+While a request is being profiled, a single background thread reads its
+thread's Python stack every `interval` seconds (sys._current_frames) and
+counts identical stacks. Unlike cProfile, this keeps the overhead small and
+independent of how many calls the request makes, and several requests can
+be profiled at once.
+Requests slower than `slow_seconds` are written out as collapsed stacks,
+one file per request under <directory>/<route>/:
+
+    spaced_repetition.py:review_word;storage.py:put 12
+
+Render them with flamegraph.pl or drop them into https://speedscope.app.
+
+Only threads that are registered get sampled, and nothing runs while none
+are registered.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional
+
+class StackSampler:
+    """Samples the stacks of registered threads from one background thread"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._active: Dict[int, Counter] = {}
+        self._labels: Dict = {}  # code object -> "file.py:function"
+        self._lock = threading.Lock()
+        self._busy = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+
+    def _collapse(self, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _loop(self):
+        me = threading.get_ident()
+        while True:
+            self._busy.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = [tid for tid in self._active if tid != me]
+            if not active:
+                continue
+            frames = sys._current_frames()
+            samples = [(tid, self._collapse(frames[tid])) for tid in active if tid in frames]
+            del frames
+            with self._lock:
+                # A thread may have been stopped meanwhile; its counts are already handed out
+                for tid, stack in samples:
+                    stacks = self._active.get(tid)
+                    if stacks is not None:
+                        stacks[stack] += 1
+
+    def start(self, thread_id: Optional[int] = None):
+        """Start sampling a thread (the current one by default)"""
+        with self._lock:
+            self._active[thread_id or threading.get_ident()] = Counter()
+            self._busy.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: Optional[int] = None) -> Counter:
+        """Stop sampling a thread; returns its collapsed stack counts"""
+        with self._lock:
+            stacks = self._active.pop(thread_id or threading.get_ident(), Counter())
+            if not self._active:
+                self._busy.clear()
+        return stacks
+
+def route_slug(route: str) -> str:
+    """A directory name for a URL rule: /api/sr/words/<word_id> -> api_sr_words_word_id"""
+    slug = "".join(c if c.isalnum() else "_" for c in route.strip("/"))
+    return "_".join(part for part in slug.split("_") if part) or "root"
+
+def write_collapsed(path: str, stacks: Counter):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+class RequestProfiler:
+    """Per-request profiles written to `directory` when a request takes `slow_seconds` or more"""
+
+    def __init__(self, directory: str = "profiles", interval: float = 0.005, slow_seconds: float = 0.0,
+                 keep: int = 50):
+        self.directory = directory
+        self.slow_seconds = slow_seconds
+        self.keep = keep
+        self.sampler = StackSampler(interval)
+        self.counters = {"profiled": 0, "written": 0}
+
+    def begin(self) -> Dict:
+        """Start profiling the current thread's request"""
+        self.sampler.start()
+        self.counters["profiled"] += 1
+        return {"id": uuid.uuid4().hex[:8], "thread": threading.get_ident(), "started": time.perf_counter()}
+
+    def end(self, profile: Dict, route: str, force: bool = False) -> Optional[str]:
+        """Stop profiling; returns the file written, if the request was slow enough (or forced)"""
+        stacks = self.sampler.stop(profile["thread"])
+        elapsed = time.perf_counter() - profile["started"]
+        # A forced profile is always written, even empty (request shorter than one interval)
+        if not force and (not stacks or elapsed < self.slow_seconds):
+            return None
+        route_dir = os.path.join(self.directory, route_slug(route))
+        os.makedirs(route_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms-{profile['id']}.collapsed"
+        path = os.path.join(route_dir, name)
+        write_collapsed(path, stacks)
+        self.counters["written"] += 1
+        self._prune(route_dir)
+        return path
+
+    def _prune(self, route_dir: str):
+        """Keep the newest `keep` profiles of a route"""
+        files = sorted(f for f in os.listdir(route_dir) if f.endswith(".collapsed"))
+        for name in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(os.path.join(route_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,180 @@
+"""Circuit breakers, hedged calls and request coalescing for the translation providers.
+
+A provider call is a function taking a `cancel` threading.Event and returning
+a result, or None for "no acceptable answer"; transport and HTTP errors are
+raised, not turned into None. `hedged` starts the first
+provider, starts the next one after its hedge delay (or straight away if
+everything in flight has already failed), returns the first acceptable result
+and sets `cancel` so the losers can stop early. A `CircuitBreaker` wrapped
+around a provider skips it for a while after repeated failures, so a dead
+backend costs nothing instead of a timeout per request. `SingleFlight` lets
+concurrent identical requests share one upstream call.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ProviderCall = Callable[[threading.Event], Any]
+
+class CircuitBreaker:
+    """closed → open after `failure_threshold` consecutive failures; after `reset_timeout`
+    seconds one trial call is let through (half-open) and its outcome closes or re-opens it"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """A permitted call ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            self._trial_running = False
+
+    def snapshot(self) -> Dict:
+        return {"name": self.name, "state": self.state, "failures": self._failures}
+
+def guarded(breaker: CircuitBreaker, call: ProviderCall, ignore: Tuple[type, ...] = ()) -> ProviderCall:
+    """Wrap a provider call so it is skipped while `breaker` is open and feeds it outcomes.
+    Only exceptions count as failures, unless the call was cancelled by a hedge winner or
+    raised one of the `ignore` types (errors that say nothing about the provider). None is
+    an answer ("nothing to offer", e.g. Google echoing a loanword) and counts as a success."""
+    def run(cancel: threading.Event):
+        if not breaker.allow():
+            return None
+        try:
+            result = call(cancel)
+        except Exception as e:
+            if cancel.is_set() or isinstance(e, ignore):
+                breaker.release()
+            else:
+                breaker.record(False)
+            raise
+        if result is None and cancel.is_set():
+            breaker.release()
+        else:
+            breaker.record(True)
+        return result
+    return run
+
+def hedged(attempts: List[Tuple[str, ProviderCall, float]], deadline: float,
+           executor: Executor) -> Optional[Tuple[str, Any]]:
+    """
+    Race provider calls. `attempts` is [(name, call, start_after_seconds), ...] in start order.
+    Returns (name, result) for the first call to produce a non-None result within `deadline`
+    seconds, or None. Calls still running are signalled to stop via their cancel event.
+    """
+    cancel = threading.Event()
+    started = time.monotonic()
+    queue = list(attempts)
+    pending = {}
+    try:
+        while True:
+            elapsed = time.monotonic() - started
+            # Launch attempts that are due, or the next one if nothing is left in flight
+            while queue and (queue[0][2] <= elapsed or not pending):
+                name, call, _ = queue.pop(0)
+                pending[executor.submit(call, cancel)] = name
+            remaining = deadline - elapsed
+            if remaining <= 0:
+                return None
+            timeout = min(remaining, queue[0][2] - elapsed) if queue else remaining
+            done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                if result is not None:
+                    return name, result
+            if not pending and not queue:
+                return None
+    finally:
+        cancel.set()
+        for future in pending:
+            future.cancel()
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution: the first caller runs it,
+    the rest wait and get the same result (or exception)"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "upstream": 0, "coalesced": 0}
+
+    def do(self, key: str, call: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.counters["calls"] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.counters["coalesced"] += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self.counters["upstream"] += 1
+                leader = True
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = call()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self.counters, "in_flight": len(self._flights)}
@@ -0,0 +1,96 @@
+"""Accent-insensitive n-gram index for vocabulary typeahead search.
+
+Every indexed field is folded (lowercased, accents stripped) and split into
+bigrams and trigrams. A query looks up the postings of its own n-grams,
+intersects them starting from the rarest, and only verifies and ranks the
+few surviving candidates, so a keystroke costs about the same on a 100-word
+deck as on a 100k-word one.
+"""
+import heapq
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, so "Perché" and "perche" compare equal"""
+    decomposed = unicodedata.normalize("NFKD", (text or "").casefold().replace("’", "'"))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def normalize(text: str) -> str:
+    """Casefold and collapse whitespace but keep accents, so "Papà " matches "papà" but not papa"""
+    composed = unicodedata.normalize("NFC", (text or "").replace("’", "'")).casefold()
+    return " ".join(composed.split())
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + n] for n in (2, 3) for i in range(len(text) - n + 1)}
+
+class SearchIndex:
+    """Inverted bigram/trigram index over a card's word, translation and notes"""
+
+    def __init__(self):
+        self._fields: Dict[str, Tuple[str, str, str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def add(self, word_id: str, word: str, translation: str, notes: str = ""):
+        """Index (or re-index) a card"""
+        self.remove(word_id)
+        fields = (fold(word), fold(translation), fold(notes))
+        self._fields[word_id] = fields
+        for gram in _grams(fields[0]) | _grams(fields[1]) | _grams(fields[2]):
+            self._postings.setdefault(gram, set()).add(word_id)
+
+    def remove(self, word_id: str):
+        """Drop a card from the index (no-op if absent)"""
+        fields = self._fields.pop(word_id, None)
+        if fields is None:
+            return
+        for gram in _grams(fields[0]) | _grams(fields[1]) | _grams(fields[2]):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(word_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def _candidates(self, query: str) -> Set[str]:
+        if len(query) < 2:
+            return set(self._fields)  # too short for an n-gram; verify everything
+        grams = _grams(query) if len(query) == 2 else {query[i:i + 3] for i in range(len(query) - 2)}
+        postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _rank(query: str, fields: Tuple[str, str, str]) -> Optional[int]:
+        """Lower is better; None when the query isn't in any field"""
+        for base, text in zip((0, 4, 8), fields):
+            if query not in text:
+                continue
+            if text == query:
+                return base
+            if text.startswith(query):
+                return base + 1
+            if any(token.startswith(query) for token in text.split()):
+                return base + 2
+            return base + 3
+        return None
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Ids of matching cards, best first: word hits before translation before notes,
+        exact before prefix before substring, shorter words first"""
+        query = fold(query).strip()
+        if not query:
+            return []
+        scored = []
+        for word_id in self._candidates(query):
+            fields = self._fields[word_id]
+            rank = self._rank(query, fields)
+            if rank is not None:
+                scored.append((rank, len(fields[0]), fields[0], word_id))
+        best = heapq.nsmallest(limit, scored) if limit is not None else sorted(scored)
+        return [word_id for *_, word_id in best]
@@ -0,0 +1,184 @@
+"""Chat session store for Ollama conversation contexts.
+
+A session's context is the token array Ollama returns so the next turn can
+skip re-prefilling the prompt. Stores bound what they hold two ways: sessions
+idle for longer than `idle_ttl` seconds expire, and once the total number of
+context tokens held exceeds `max_tokens` the least recently used sessions are
+evicted. Both backends share one interface:
+
+    get_context(session_id) -> list of ints, or None
+    set_context(session_id, context)
+    delete(session_id)
+    stats() -> dict
+    close()
+
+"memory" keeps sessions in this process; "sqlite" keeps them in a file every
+worker can open, so a conversation stays warm whichever worker serves it.
+"""
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+class MemorySessionStore:
+    """In-process LRU of contexts with idle expiry and a token budget"""
+
+    def __init__(self, max_tokens: int = 2_000_000, idle_ttl: float = 3600.0):
+        self.max_tokens = max_tokens
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, Tuple[array, float]]" = OrderedDict()  # oldest first
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def _drop(self, session_id: str):
+        context, _ = self._sessions.pop(session_id)
+        self._tokens -= len(context)
+
+    def _expire(self, now: float):
+        # Access order is also idle order, so expired sessions sit at the front
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            self._drop(session_id)
+            self.counters["expired"] += 1
+
+    def get_context(self, session_id: str) -> Optional[List[int]]:
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            self.counters["hits"] += 1
+            return entry[0].tolist()
+
+    def set_context(self, session_id: str, context: List[int]):
+        now = time.time()
+        packed = array("i", context or [])
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+            self._sessions[session_id] = (packed, now)
+            self._tokens += len(packed)
+            self._expire(now)
+            while self._tokens > self.max_tokens and len(self._sessions) > 1:
+                self._drop(next(iter(self._sessions)))
+                self.counters["evicted"] += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "tokens": self._tokens,
+                    "max_tokens": self.max_tokens, **self.counters}
+
+    def close(self):
+        pass
+
+class SQLiteSessionStore:
+    """Contexts in a SQLite file shared by all workers; same eviction policy"""
+
+    def __init__(self, path: str = "sessions.db", max_tokens: int = 2_000_000, idle_ttl: float = 3600.0):
+        self.path = path
+        self.max_tokens = max_tokens
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, context BLOB NOT NULL, tokens INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions(last_used)")
+        self._conn.commit()
+
+    def get_context(self, session_id: str) -> Optional[List[int]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT context, last_used FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is not None and now - row[1] >= self.idle_ttl:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._conn.commit()
+                self.counters["expired"] += 1
+                row = None
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+            self._conn.commit()
+            self.counters["hits"] += 1
+            context = array("i")
+            context.frombytes(row[0])
+            return context.tolist()
+
+    def set_context(self, session_id: str, context: List[int]):
+        now = time.time()
+        packed = array("i", context or [])
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, context, tokens, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET context = excluded.context, tokens = excluded.tokens, "
+                "last_used = excluded.last_used",
+                (session_id, packed.tobytes(), len(packed), now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        cur = self._conn.execute("DELETE FROM sessions WHERE last_used <= ?", (now - self.idle_ttl,))
+        self.counters["expired"] += cur.rowcount
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(tokens), 0) FROM sessions").fetchone()
+        if total <= self.max_tokens:
+            return
+        # Walk sessions oldest first until enough tokens are freed (always keep the newest)
+        victims = []
+        for session_id, tokens in self._conn.execute(
+            "SELECT id, tokens FROM sessions ORDER BY last_used"
+        ).fetchall()[:-1]:
+            if total <= self.max_tokens:
+                break
+            victims.append((session_id,))
+            total -= tokens
+        self._conn.executemany("DELETE FROM sessions WHERE id = ?", victims)
+        self.counters["evicted"] += len(victims)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sessions, tokens = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM sessions"
+            ).fetchone()
+            return {"backend": "sqlite", "sessions": sessions, "tokens": tokens,
+                    "max_tokens": self.max_tokens, **self.counters}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+SESSION_BACKENDS = {"memory": MemorySessionStore, "sqlite": SQLiteSessionStore}
+
+def open_session_store(kind: str = "memory", path: Optional[str] = None, **options):
+    """Create a session store by name ("memory" or "sqlite")"""
+    if kind not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session store: {kind} (expected one of {', '.join(SESSION_BACKENDS)})")
+    if kind == "sqlite":
+        return SQLiteSessionStore(path or "sessions.db", **options)
+    return MemorySessionStore(**options)
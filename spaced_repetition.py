@@ -1,36 +1,423 @@
-import json
+import sys
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from collections.abc import Mapping
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import pytz
+from morphology import KnownWordMatcher
+from search_index import SearchIndex, normalize
+from storage import CARD_FIELDS, JSONStorage
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# One shared tzinfo per distinct UTC offset rather than one per parsed timestamp
+_ZONES: Dict[timedelta, timezone] = {}
+# The epoch expressed in each of those zones, so formatting is a single addition
+_ZONE_EPOCHS: Dict[timezone, datetime] = {}
+_CARD_FIELD_SET = frozenset(CARD_FIELDS)
+_TIMESTAMP_FIELDS = frozenset(("created", "last_reviewed", "next_review"))
+
+# Review-load forecast buckets and the longest horizon served
+FORECAST_GROUPS = ("day", "week", "month")
+MAX_FORECAST_DAYS = 3660
+
+# Per-row errors kept in an add_words summary
+MAX_IMPORT_ERRORS = 20
+
+# Sorts after any word id, so (epoch, _LAST_ID) is an inclusive upper bound
+_LAST_ID = "\U0010ffff"
+
+def _id_key(word_id: str) -> Tuple[int, str]:
+    return len(word_id), word_id
+
+def _to_stamp(moment: datetime, tz) -> Tuple[int, Optional[timezone]]:
+    """Datetime -> (UTC epoch microseconds, its UTC offset zone, or None if naive; naive is read as `tz`)"""
+    if moment.tzinfo is None:
+        return (tz.localize(moment) - _EPOCH) // _MICROSECOND, None
+    offset = moment.utcoffset()
+    zone = _ZONES.get(offset)
+    if zone is None:
+        zone = _ZONES.setdefault(offset, timezone(offset))
+        _ZONE_EPOCHS[zone] = _EPOCH.astimezone(zone)
+    return (moment - _EPOCH) // _MICROSECOND, zone
+
+# A _to_stamp zone, or the original string when formatting would not reproduce it exactly
+Zone = Union[timezone, str, None]
+
+def _parse_stamp(text: str, tz) -> Tuple[int, Zone]:
+    """Stored ISO string -> (epoch microseconds, zone). The zone is the string itself when it
+    would not format back identically: a "Z" suffix, a naive time in a DST gap, other layouts"""
+    moment = datetime.fromisoformat(text)
+    epoch_us, zone = _to_stamp(moment, tz)
+    if moment.isoformat() != text or (zone is None and _from_stamp(epoch_us, None, tz) != text):
+        return epoch_us, text
+    return epoch_us, zone
+
+def _from_stamp(epoch_us: int, zone: Zone, tz) -> str:
+    """Inverse of _to_stamp/_parse_stamp: the ISO string the timestamp was originally written as"""
+    if isinstance(zone, str):
+        return zone
+    if zone is None:
+        return (_EPOCH + timedelta(microseconds=epoch_us)).astimezone(tz).replace(tzinfo=None).isoformat()
+    return (_ZONE_EPOCHS[zone] + timedelta(microseconds=epoch_us)).isoformat()
+
+class Card:
+    """One vocabulary card.
+
+    Timestamps are parsed once into UTC epoch microseconds; the original UTC
+    offset (or the string itself, where the offset alone can't reproduce it)
+    is kept alongside so to_dict() returns the stored ISO strings unchanged.
+    """
+
+    __slots__ = (
+        "id", "word", "translation", "example", "word_type", "notes",
+        "created_us", "created_zone", "last_reviewed_us", "last_reviewed_zone",
+        "next_review_us", "next_review_zone",
+        "interval", "ease_factor", "review_count", "correct_count", "incorrect_count",
+        "extra",
+    )
+
+    @classmethod
+    def from_dict(cls, data: Dict, tz) -> "Card":
+        card = cls()
+        card.id = data["id"]
+        card.word = data["word"]
+        card.translation = data["translation"]
+        card.example = data.get("example", "")
+        card.word_type = sys.intern(data.get("word_type", ""))  # a handful of distinct values
+        card.notes = data.get("notes", "")
+        # Older or hand-edited decks may lack timestamps: no creation or review time, and
+        # due from creation (as add_word sets it) or else straight away
+        if data.get("created"):
+            card.created_us, card.created_zone = _parse_stamp(data["created"], tz)
+        else:
+            card.created_us = card.created_zone = None
+        if data.get("last_reviewed"):
+            card.last_reviewed_us, card.last_reviewed_zone = _parse_stamp(data["last_reviewed"], tz)
+        else:
+            card.last_reviewed_us = card.last_reviewed_zone = None
+        if data.get("next_review"):
+            card.next_review_us, card.next_review_zone = _parse_stamp(data["next_review"], tz)
+        elif card.created_us is not None:
+            card.next_review_us, card.next_review_zone = card.created_us, card.created_zone
+        else:
+            card.next_review_us, card.next_review_zone = _to_stamp(datetime.now(tz), tz)
+        card.interval = data.get("interval", 0)
+        card.ease_factor = data.get("ease_factor", 2.5)
+        card.review_count = data.get("review_count", 0)
+        card.correct_count = data.get("correct_count", 0)
+        card.incorrect_count = data.get("incorrect_count", 0)
+        # Keys this model doesn't know about are carried through untouched
+        extra = data.keys() - _CARD_FIELD_SET
+        card.extra = {k: data[k] for k in extra} if extra else None
+        return card
+
+    def field(self, name: str, tz):
+        """One field of the API representation (timestamps formatted, unknown keys from extra)"""
+        if name in _TIMESTAMP_FIELDS:
+            epoch_us = getattr(self, name + "_us")
+            return _from_stamp(epoch_us, getattr(self, name + "_zone"), tz) if epoch_us is not None else None
+        if name in _CARD_FIELD_SET:
+            return getattr(self, name)
+        return (self.extra or {}).get(name)
+
+    def to_dict(self, tz, fields: Optional[List[str]] = None) -> Dict:
+        """API/storage representation, in the original field order (or just `fields`)"""
+        if fields is not None:
+            return {name: self.field(name, tz) for name in fields}
+        data = {
+            "id": self.id,
+            "word": self.word,
+            "translation": self.translation,
+            "example": self.example,
+            "word_type": self.word_type,
+            "notes": self.notes,
+            "created": _from_stamp(self.created_us, self.created_zone, tz) if self.created_us is not None else None,
+            "last_reviewed": (_from_stamp(self.last_reviewed_us, self.last_reviewed_zone, tz)
+                              if self.last_reviewed_us is not None else None),
+            "next_review": _from_stamp(self.next_review_us, self.next_review_zone, tz),
+            "interval": self.interval,
+            "ease_factor": self.ease_factor,
+            "review_count": self.review_count,
+            "correct_count": self.correct_count,
+            "incorrect_count": self.incorrect_count
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+class CardDicts(Mapping):
+    """Read-only {word_id: card dict} view handed to the storage backends"""
+
+    def __init__(self, vocabulary: Dict[str, Card], tz):
+        self._vocabulary = vocabulary
+        self._tz = tz
+
+    def __getitem__(self, word_id: str) -> Dict:
+        return self._vocabulary[word_id].to_dict(self._tz)
+
+    def __iter__(self):
+        return iter(self._vocabulary)
+
+    def __len__(self) -> int:
+        return len(self._vocabulary)
+
+class _SortedKeys:
+    """Sorted list of keys split into buckets of at most 2 * LOAD, so an insert or
+    removal moves at most one bucket's worth of items. A Fenwick tree over the
+    bucket sizes answers "how many keys sort before k" in O(log N)."""
+
+    LOAD = 512
+
+    def __init__(self, keys: Iterable = ()):
+        keys = sorted(keys)
+        self._buckets: List[list] = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._reindex()
+
+    def _reindex(self):
+        """Rebuild the bucket maxima and the size tree (after a split or an emptied bucket)"""
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            self._tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+        self._len = sum(len(bucket) for bucket in self._buckets)
+
+    def _grow(self, i: int, delta: int):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+        self._len += delta
+
+    def _before_bucket(self, i: int) -> int:
+        """Keys in buckets[:i]"""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._reindex()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._reindex()
+        else:
+            self._grow(i, 1)
+
+    def remove(self, key) -> bool:
+        """Remove `key` if present"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            return False
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            return False
+        del bucket[j]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._grow(i, -1)
+        else:
+            del self._buckets[i]
+            self._reindex()
+        return True
+
+    def bisect_left(self, key) -> int:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            return self._len
+        return self._before_bucket(i) + bisect_left(self._buckets[i], key)
+
+    def bisect_right(self, key) -> int:
+        i = bisect_right(self._maxes, key)
+        if i == len(self._buckets):
+            return self._len
+        return self._before_bucket(i) + bisect_right(self._buckets[i], key)
+
+    def head(self, n: int) -> Iterator:
+        """The first `n` keys, in order"""
+        for bucket in self._buckets:
+            if n <= 0:
+                return
+            yield from bucket[:n]
+            n -= len(bucket)
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+class DueIndex:
+    """Word ids kept ordered by next review time (epoch microseconds); O(log N) updates and counts"""
+
+    def __init__(self, items: Iterable[Tuple[str, int]] = ()):
+        self._epochs: Dict[str, int] = dict(items)
+        # Built with one sort rather than N inserts
+        self._keys = _SortedKeys((epoch, word_id) for word_id, epoch in self._epochs.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, word_id: str, epoch: int):
+        """Insert or move a word to its new review time"""
+        self.remove(word_id)
+        self._keys.add((epoch, word_id))
+        self._epochs[word_id] = epoch
+
+    def remove(self, word_id: str):
+        """Drop a word from the index (no-op if absent)"""
+        epoch = self._epochs.pop(word_id, None)
+        if epoch is not None:
+            self._keys.remove((epoch, word_id))
+
+    def count_until(self, end: int) -> int:
+        """Number of words due at or before `end`"""
+        return self._keys.bisect_right((end, _LAST_ID))
+
+    def count_between(self, boundaries: List[int]) -> List[int]:
+        """Counts of words due in [boundaries[i], boundaries[i+1]) for sorted boundaries"""
+        positions = [self._keys.bisect_left((boundary,)) for boundary in boundaries]
+        return [hi - lo for lo, hi in zip(positions, positions[1:])]
+
+    def until(self, end: int) -> Iterator[Tuple[int, str]]:
+        """(epoch, word_id) pairs due at or before `end`, earliest first"""
+        return self._keys.head(self.count_until(end))
+
+# Interval histogram buckets: (label, lowest interval in days)
+INTERVAL_BUCKETS = (
+    ("0", 0), ("1", 1), ("2-6", 2), ("7-29", 7), ("30-89", 30),
+    ("90-179", 90), ("180-364", 180), ("365+", 365),
+)
+_INTERVAL_FLOORS = [floor for _, floor in INTERVAL_BUCKETS]
+
+class DeckStats:
+    """Running totals over the deck, adjusted per card instead of recomputed; not thread-safe, the deck lock guards it"""
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self.total_reviews = 0
+        self.total_correct = 0
+        self.word_types: Counter = Counter()
+        self.ease: Counter = Counter()
+        self.intervals: Counter = Counter()
+        for card in cards:
+            self.add(card)
+
+    @staticmethod
+    def _interval_bucket(interval: int) -> str:
+        return INTERVAL_BUCKETS[max(0, bisect_right(_INTERVAL_FLOORS, interval) - 1)][0]
+
+    def _apply(self, card: Card, sign: int):
+        self.total_reviews += sign * card.review_count
+        self.total_correct += sign * card.correct_count
+        self.word_types[card.word_type or "unknown"] += sign
+        self.ease[round(card.ease_factor, 1)] += sign
+        self.intervals[self._interval_bucket(card.interval)] += sign
+
+    def add(self, card: Card):
+        self._apply(card, 1)
+
+    def remove(self, card: Card):
+        self._apply(card, -1)
+
+    def histograms(self) -> Dict:
+        """Per-word-type counts and ease/interval distributions (empty buckets omitted)"""
+        return {
+            "word_types": {k: n for k, n in sorted(self.word_types.items()) if n},
+            "ease_histogram": {f"{k:.1f}": n for k, n in sorted(self.ease.items()) if n},
+            "interval_histogram": {label: self.intervals[label] for label, _ in INTERVAL_BUCKETS if self.intervals[label]},
+        }
 
 class SpacedRepetition:
-    def __init__(self, data_file: str = "vocabulary.json"):
-        self.data_file = data_file
-        self.vocabulary = self.load_vocabulary()
+    def __init__(self, data_file: str = "vocabulary.json", storage=None):
+        # Any backend from storage.py; defaults to the JSON file
+        self.storage = storage or JSONStorage(data_file)
+        self.data_file = self.storage.path
         # Melbourne timezone
         self.melbourne_tz = pytz.timezone('Australia/Melbourne')
+        # Requests run on several threads; every change to the cards and the indexes
+        # derived from them, and every read of those indexes, holds this lock
+        self._lock = threading.RLock()
+        # {word_id: Card}; use get_all_words()/to_dict() for the JSON representation
+        self.vocabulary = self.load_vocabulary()
+        self._rebuild_due_index()
+        self._stats = DeckStats(self.vocabulary.values())
+        self._search_index = SearchIndex()
+        # Normalized word (accents kept) -> ids, for duplicate checks on import
+        self._word_ids: Dict[str, Set[str]] = {}
+        for word_id, card in self.vocabulary.items():
+            self._search_index.add(word_id, card.word, card.translation, card.notes)
+            self._word_ids.setdefault(normalize(card.word), set()).add(word_id)
+        self._last_id = max((int(word_id) for word_id in self.vocabulary if word_id.isdigit()), default=0)
+        # Ids in a stable order for cursor pagination (numeric ids sort numerically)
+        self._id_order: List[Tuple[int, str]] = sorted(_id_key(word_id) for word_id in self.vocabulary)
+        # Bumped on every change; with the instance token it makes a cheap ETag for the deck
+        self.version = 0
+        self._instance = uuid.uuid4().hex[:12]
+        # Bumped only when words are added or deleted (reviews don't change the known-word set)
+        self.words_version = 0
+        # Every inflected form of the deck's words; built on first use, then kept up to date
+        self._matcher: Optional[KnownWordMatcher] = None
         
-    def load_vocabulary(self) -> Dict:
-        """Load vocabulary from JSON file"""
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-        except json.JSONDecodeError:
-            return {}
+    def _now(self) -> Tuple[datetime, int]:
+        """Current Melbourne time and the same instant in epoch microseconds"""
+        now = datetime.now(self.melbourne_tz)
+        return now, _to_stamp(now, self.melbourne_tz)[0]
+
+    def _rebuild_due_index(self):
+        """Index every word by its next review time"""
+        self._due_index = DueIndex((word_id, card.next_review_us) for word_id, card in self.vocabulary.items())
+
+    def _with_timing(self, card: Card, now_us: int) -> Dict:
+        """A word's dict plus its time-until-review fields"""
+        time_until = timedelta(microseconds=card.next_review_us - now_us)
+        word_data = card.to_dict(self.melbourne_tz)  # already a fresh dict, no need to copy
+        word_data["time_until_seconds"] = int(time_until.total_seconds())  # Convert to integer seconds
+        word_data["human_readable"] = self._format_time_interval(time_until)
+        word_data["is_overdue"] = time_until.total_seconds() < 0
+        return word_data
+
+    def load_vocabulary(self) -> Dict[str, Card]:
+        """Load vocabulary from the storage backend"""
+        raw = self.storage.load()
+        # Pop as we convert so the raw dicts are freed while the cards are built
+        return {word_id: Card.from_dict(raw.pop(word_id), self.melbourne_tz) for word_id in list(raw)}
     
     def save_vocabulary(self):
-        """Save vocabulary to JSON file"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.vocabulary, f, ensure_ascii=False, indent=2)
+        """Write the whole vocabulary to the storage backend"""
+        with self._lock:
+            self.storage.save_all(self._card_dicts())
+
+    def _card_dicts(self) -> CardDicts:
+        return CardDicts(self.vocabulary, self.melbourne_tz)
     
-    def add_word(self, word: str, translation: str, example: str = "", word_type: str = "", notes: str = "") -> Dict:
-        """Add a new word to the vocabulary"""
-        word_id = str(int(time.time() * 1000))  # Unique ID based on timestamp
-        
-        now = datetime.now(self.melbourne_tz)
+    def _new_word_id(self) -> str:
+        """Timestamp-based id (ms), bumped past the last one so same-millisecond adds can't collide"""
+        candidate = max(int(time.time() * 1000), self._last_id + 1)
+        while str(candidate) in self.vocabulary:
+            candidate += 1
+        self._last_id = candidate
+        return str(candidate)
+
+    def _insert_word(self, word: str, translation: str, example: str, word_type: str, notes: str, now: datetime) -> Dict:
+        """Create a card and update every index, without persisting it (caller holds the lock)"""
+        word_id = self._new_word_id()  # Unique ID based on timestamp
         word_data = {
             "id": word_id,
             "word": word,
@@ -48,41 +435,120 @@ class SpacedRepetition:
             "incorrect_count": 0
         }
         
-        self.vocabulary[word_id] = word_data
-        self.save_vocabulary()
+        card = Card.from_dict(word_data, self.melbourne_tz)
+        self.vocabulary[word_id] = card
+        self._due_index.add(word_id, card.next_review_us)
+        self._stats.add(card)
+        self._search_index.add(word_id, word, translation, notes)
+        self._word_ids.setdefault(normalize(word), set()).add(word_id)
+        insort(self._id_order, _id_key(word_id))
+        if self._matcher is not None:
+            self._matcher.add(word, word_type)
+        self.version += 1
+        self.words_version += 1
         return word_data
+
+    def add_word(self, word: str, translation: str, example: str = "", word_type: str = "", notes: str = "") -> Dict:
+        """Add a new word to the vocabulary"""
+        with self._lock:
+            word_data = self._insert_word(word, translation, example, word_type, notes, datetime.now(self.melbourne_tz))
+            self.storage.put(self._card_dicts(), word_data["id"])
+        return word_data
+
+    def find_word(self, word: str) -> Optional[str]:
+        """Id of a card with this word (case-insensitive; accents count: papa and papà differ), if any"""
+        with self._lock:
+            ids = self._word_ids.get(normalize(word))
+            return next(iter(ids)) if ids else None
+
+    def add_words(self, rows: Iterable[Dict], batch_size: int = 500, skip_duplicates: bool = True,
+                  progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Bulk-add words from an iterable of {word, translation, example, word_type, notes} dicts.
+
+        Rows are consumed lazily and persisted every `batch_size` additions with one
+        put_many. Backends that rewrite the whole deck per write get batches that grow
+        with the deck, so an import costs O(N) writes in total either way.
+        Duplicates (already in the deck or earlier in the import) are skipped unless
+        skip_duplicates is False. `progress` is called with the running summary every
+        `batch_size` rows and once at the end.
+        """
+        summary = {"processed": 0, "added": 0, "duplicates": 0, "invalid": 0, "errors": []}
+        pending = []
+
+        def flush():
+            if pending:
+                with self._lock:
+                    self.storage.put_many(self._card_dicts(), pending)
+                pending.clear()
+
+        for row in rows:
+            if progress and summary["processed"] and summary["processed"] % batch_size == 0:
+                progress(summary)
+            summary["processed"] += 1
+            if not isinstance(row, dict):
+                row = {}
+            word = str(row.get("word") or "").strip()
+            translation = str(row.get("translation") or "").strip()
+            if not word or not translation:
+                summary["invalid"] += 1
+                if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+                    summary["errors"].append({"row": summary["processed"], "error": "Word and translation are required"})
+                continue
+            # Locked per row rather than per batch: `rows` may be reading a slow upload
+            with self._lock:
+                if skip_duplicates and self.find_word(word):
+                    summary["duplicates"] += 1
+                    continue
+                word_data = self._insert_word(
+                    word, translation,
+                    str(row.get("example") or "").strip(),
+                    str(row.get("word_type") or "").strip(),
+                    str(row.get("notes") or "").strip(),
+                    datetime.now(self.melbourne_tz),
+                )
+            pending.append(word_data["id"])
+            summary["added"] += 1
+
+            limit = max(batch_size, len(self.vocabulary)) if self.storage.whole_deck_writes else batch_size
+            if len(pending) >= limit:
+                flush()
+
+        flush()
+        if progress:
+            progress(summary)
+        return summary
     
     def delete_word(self, word_id: str) -> bool:
         """Delete a word from vocabulary"""
-        if word_id in self.vocabulary:
-            del self.vocabulary[word_id]
-            self.save_vocabulary()
+        with self._lock:
+            if word_id not in self.vocabulary:
+                return False
+            card = self.vocabulary.pop(word_id)
+            self._stats.remove(card)
+            self._word_ids.get(normalize(card.word), set()).discard(word_id)
+            self._due_index.remove(word_id)
+            self._search_index.remove(word_id)
+            i = bisect_left(self._id_order, _id_key(word_id))
+            if i < len(self._id_order) and self._id_order[i][1] == word_id:
+                del self._id_order[i]
+            if self._matcher is not None:
+                self._matcher.remove(card.word, card.word_type)
+            self.version += 1
+            self.words_version += 1
+            self.storage.delete(self._card_dicts(), word_id)
             return True
-        return False
     
     def get_due_words(self) -> List[Dict]:
         """Get words that are due for review (including overdue)"""
-        now = datetime.now(self.melbourne_tz)
-        due_words = []
-        
-        for word_data in self.vocabulary.values():
-            next_review = datetime.fromisoformat(word_data["next_review"])
-            # Make naive datetime timezone-aware for comparison
-            if next_review.tzinfo is None:
-                next_review = self.melbourne_tz.localize(next_review)
-            if next_review <= now:
-                # Calculate how overdue the word is
-                time_until = next_review - now
-                due_words.append({
-                    **word_data,
-                    "time_until_seconds": int(time_until.total_seconds()),  # Convert to integer seconds
-                    "human_readable": self._format_time_interval(time_until),
-                    "is_overdue": time_until.total_seconds() < 0
-                })
+        _, now_us = self._now()
         
-        # Sort by how overdue they are (most overdue first)
-        due_words.sort(key=lambda x: x["time_until_seconds"])
-        return due_words
+        # The index is already ordered by how overdue they are (most overdue first)
+        with self._lock:
+            return [
+                self._with_timing(self.vocabulary[word_id], now_us)
+                for _, word_id in self._due_index.until(now_us)
+            ]
     
     def get_overdue_words(self) -> List[Dict]:
         """Get only overdue words (words past their review date)"""
@@ -91,7 +557,40 @@ class SpacedRepetition:
     
     def get_all_words(self) -> List[Dict]:
         """Get all vocabulary words"""
-        return list(self.vocabulary.values())
+        with self._lock:
+            return [card.to_dict(self.melbourne_tz) for card in self.vocabulary.values()]
+
+    def known_words(self) -> Tuple[KnownWordMatcher, str]:
+        """Set-like lookup of the deck's words and their inflections for chat validation,
+        and a version tag that changes when a word is added or deleted"""
+        with self._lock:
+            if self._matcher is None:
+                self._matcher = KnownWordMatcher((card.word, card.word_type) for card in self.vocabulary.values())
+            return self._matcher, f"{self._instance}-{self.words_version}"
+
+    @property
+    def etag(self) -> str:
+        """Changes whenever any word is added, reviewed or deleted"""
+        return f"{self._instance}-{self.version}"
+
+    def get_words_page(self, cursor: Optional[str] = None, limit: Optional[int] = None,
+                       fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Words in id order, starting after `cursor` (a word id from a previous page).
+        Returns (words, next_cursor); next_cursor is None on the last page.
+        `fields` limits each word to those keys (id is always included).
+        """
+        if fields is not None:
+            fields = ["id"] + [f for f in dict.fromkeys(fields) if f != "id"]
+        with self._lock:
+            start = bisect_right(self._id_order, _id_key(cursor)) if cursor else 0
+            end = len(self._id_order) if limit is None else min(start + limit, len(self._id_order))
+            words = [
+                self.vocabulary[word_id].to_dict(self.melbourne_tz, fields)
+                for _, word_id in self._id_order[start:end]
+            ]
+            next_cursor = self._id_order[end - 1][1] if end < len(self._id_order) and end > start else None
+        return words, next_cursor
     
     def review_word(self, word_id: str, quality: int) -> Dict:
         """
@@ -103,47 +602,54 @@ class SpacedRepetition:
         4: Easy response
         5: Very easy response
         """
-        if word_id not in self.vocabulary:
-            raise ValueError("Word not found")
-        
-        word_data = self.vocabulary[word_id]
-        now = datetime.now(self.melbourne_tz)
+        with self._lock:
+            if word_id not in self.vocabulary:
+                raise ValueError("Word not found")
+
+            card = self._apply_review(word_id, quality, datetime.now(self.melbourne_tz))
+            self.storage.put(self._card_dicts(), word_id)
+            return card.to_dict(self.melbourne_tz)
+
+    def _apply_review(self, word_id: str, quality: int, now: datetime) -> Card:
+        """Schedule a word as reviewed at `now` (SuperMemo 2), without persisting (caller holds the lock)"""
+        card = self.vocabulary[word_id]
+        self._stats.remove(card)
         
         # Update review statistics
-        word_data["last_reviewed"] = now.isoformat()
-        word_data["review_count"] += 1
+        card.last_reviewed_us, card.last_reviewed_zone = _to_stamp(now, self.melbourne_tz)
+        card.review_count += 1
         
         if quality >= 3:
-            word_data["correct_count"] += 1
+            card.correct_count += 1
         else:
-            word_data["incorrect_count"] += 1
+            card.incorrect_count += 1
         
         # Calculate new interval using proper SuperMemo 2 algorithm
         if quality < 3:
             # Incorrect response - reset interval
-            word_data["interval"] = 0
-            word_data["ease_factor"] = max(1.3, word_data["ease_factor"] - 0.2)
+            card.interval = 0
+            card.ease_factor = max(1.3, card.ease_factor - 0.2)
         else:
             # Correct response
-            if word_data["interval"] == 0:
-                word_data["interval"] = 1
-            elif word_data["interval"] == 1:
-                word_data["interval"] = 6
-            elif word_data["interval"] == 6:
-                word_data["interval"] = int(6 * word_data["ease_factor"])
+            if card.interval == 0:
+                card.interval = 1
+            elif card.interval == 1:
+                card.interval = 6
+            elif card.interval == 6:
+                card.interval = int(6 * card.ease_factor)
             else:
-                word_data["interval"] = int(word_data["interval"] * word_data["ease_factor"])
+                card.interval = int(card.interval * card.ease_factor)
             
             # Adjust ease factor
             if quality == 3:
-                word_data["ease_factor"] = word_data["ease_factor"] + 0.1
+                card.ease_factor = card.ease_factor + 0.1
             elif quality == 4:
-                word_data["ease_factor"] = word_data["ease_factor"] + 0.15
+                card.ease_factor = card.ease_factor + 0.15
             elif quality == 5:
-                word_data["ease_factor"] = word_data["ease_factor"] + 0.2
+                card.ease_factor = card.ease_factor + 0.2
             
             # Cap ease factor
-            word_data["ease_factor"] = min(2.5, word_data["ease_factor"])
+            card.ease_factor = min(2.5, card.ease_factor)
         
         # Calculate next review date with improved intervals
         if quality == 0 or quality == 1:
@@ -154,76 +660,164 @@ class SpacedRepetition:
             next_review = now + timedelta(days=1)
         elif quality == 3:
             # Good - use calculated interval
-            next_review = now + timedelta(days=word_data["interval"])
+            next_review = now + timedelta(days=card.interval)
         else:
             # Easy (4-5) - use calculated interval
-            next_review = now + timedelta(days=word_data["interval"])
+            next_review = now + timedelta(days=card.interval)
         
-        word_data["next_review"] = next_review.isoformat()
-        
-        self.save_vocabulary()
-        return word_data
+        card.next_review_us, card.next_review_zone = _to_stamp(next_review, self.melbourne_tz)
+        self._due_index.add(word_id, card.next_review_us)
+        self._stats.add(card)
+        self.version += 1
+        return card
+
+    def _parse_reviewed_at(self, reviewed_at, now: datetime) -> datetime:
+        """ISO 8601 string or epoch milliseconds (as from Date.now()) -> Melbourne time, capped at now"""
+        if reviewed_at is None:
+            return now
+        if isinstance(reviewed_at, bool) or not isinstance(reviewed_at, (int, float, str)):
+            raise ValueError("reviewed_at must be an ISO 8601 string or epoch milliseconds")
+        if isinstance(reviewed_at, str):
+            moment = datetime.fromisoformat(reviewed_at.replace("Z", "+00:00"))
+            if moment.tzinfo is None:
+                moment = self.melbourne_tz.localize(moment)
+            moment = moment.astimezone(self.melbourne_tz)
+        else:
+            moment = datetime.fromtimestamp(reviewed_at / 1000, self.melbourne_tz)
+        # A review can't happen in the future; don't let a fast client clock push it there
+        return min(moment, now)
+
+    def review_words(self, reviews: List[Dict]) -> List[Dict]:
+        """
+        Apply a batch of reviews ({word_id, quality, reviewed_at}) in reviewed_at order
+        and persist them with a single storage write.
+
+        Returns one result per input item, in input order: {"word_id", "success", "word"}
+        or {"word_id", "success": False, "error"} for items that were rejected.
+        """
+        with self._lock:
+            return self._review_words(reviews)
+
+    def _review_words(self, reviews: List[Dict]) -> List[Dict]:
+        now = datetime.now(self.melbourne_tz)
+        results: List[Optional[Dict]] = [None] * len(reviews)
+        accepted = []
+        for position, item in enumerate(reviews):
+            word_id = item.get("word_id") if isinstance(item, dict) else None
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("Each review must be an object")
+                quality = item.get("quality")
+                if isinstance(quality, bool) or not isinstance(quality, int) or quality < 0 or quality > 5:
+                    raise ValueError("Quality must be an integer between 0 and 5")
+                if word_id not in self.vocabulary:
+                    raise ValueError("Word not found")
+                accepted.append((self._parse_reviewed_at(item.get("reviewed_at"), now), position, word_id, quality))
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                results[position] = {"word_id": word_id, "success": False, "error": str(e)}
+
+        touched = []
+        for reviewed_at, position, word_id, quality in sorted(accepted, key=lambda r: (r[0], r[1])):
+            card = self._apply_review(word_id, quality, reviewed_at)
+            results[position] = {"word_id": word_id, "success": True, "word": card.to_dict(self.melbourne_tz)}
+            touched.append(word_id)
+
+        if touched:
+            self.storage.put_many(self._card_dicts(), list(dict.fromkeys(touched)))
+        return results
     
-    def get_stats(self) -> Dict:
-        """Get overall statistics"""
-        total_words = len(self.vocabulary)
-        due_words = len(self.get_due_words())
-        total_reviews = sum(word["review_count"] for word in self.vocabulary.values())
-        total_correct = sum(word["correct_count"] for word in self.vocabulary.values())
+    def get_stats(self, detailed: bool = False) -> Dict:
+        """Get overall statistics (O(1); detailed adds word-type, ease and interval breakdowns)"""
+        now_us = self._now()[1]
+        with self._lock:
+            total_words = len(self.vocabulary)
+            due_words = self._due_index.count_until(now_us)
+            total_reviews = self._stats.total_reviews
+            total_correct = self._stats.total_correct
+            histograms = self._stats.histograms() if detailed else None
         
         accuracy = (total_correct / total_reviews * 100) if total_reviews > 0 else 0
         
-        return {
+        stats = {
             "total_words": total_words,
             "due_words": due_words,
             "total_reviews": total_reviews,
             "accuracy": round(accuracy, 1)
         }
+        if detailed:
+            stats.update(histograms)
+        return stats
     
     def get_upcoming_reviews(self, days_ahead: int = 7) -> List[Dict]:
         """Get words that will be due for review in the next X days (including overdue)"""
-        now = datetime.now(self.melbourne_tz)
-        end_date = now + timedelta(days=days_ahead)
+        _, now_us = self._now()
+        end_us = now_us + days_ahead * 86400 * 1000000
+        overdue = []
         upcoming = []
         
-        for word_data in self.vocabulary.values():
-            next_review = datetime.fromisoformat(word_data["next_review"])
-            # Make naive datetime timezone-aware for comparison
-            if next_review.tzinfo is None:
-                next_review = self.melbourne_tz.localize(next_review)
-            
-            # Include overdue words and words due in the next X days
-            if next_review <= end_date:
-                time_until = next_review - now
-                upcoming.append({
-                    **word_data,
-                    "time_until_seconds": int(time_until.total_seconds()),  # Convert to integer seconds
-                    "human_readable": self._format_time_interval(time_until),
-                    "is_overdue": time_until.total_seconds() < 0
-                })
+        # Include overdue words and words due in the next X days
+        with self._lock:
+            for _, word_id in self._due_index.until(end_us):
+                entry = self._with_timing(self.vocabulary[word_id], now_us)
+                (overdue if entry["is_overdue"] else upcoming).append(entry)
         
-        # Sort by urgency: overdue first (most overdue first), then future reviews
-        upcoming.sort(key=lambda x: (x["is_overdue"], x["time_until_seconds"]))
-        return upcoming
+        # Same order as sorting by (is_overdue, time_until_seconds): future reviews
+        # soonest first, then overdue words most overdue first
+        return upcoming + overdue
+
+    def _local_midnight(self, day: date) -> int:
+        """Start of a Melbourne calendar day, in epoch microseconds"""
+        return _to_stamp(self.melbourne_tz.localize(datetime.combine(day, dt_time.min)), self.melbourne_tz)[0]
+
+    def get_daily_upcoming_counts(self, days_ahead: int = 7, group_by: str = "day") -> List[Dict]:
+        """
+        Get count of words due for review each day in the next X days (Anki-style)
+
+        group_by="week" or "month" folds the same horizon into 7-day or calendar-month
+        buckets. Each bucket is two bisects into the due index, so the cost depends on
+        the number of buckets, not on the deck size.
+        """
+        if group_by not in FORECAST_GROUPS:
+            raise ValueError(f"group_by must be one of {', '.join(FORECAST_GROUPS)}")
+        days_ahead = min(days_ahead, MAX_FORECAST_DAYS)
+        if days_ahead < 0:
+            return []
 
-    def get_daily_upcoming_counts(self, days_ahead: int = 7) -> List[Dict]:
-        """Get count of words due for review each day in the next X days (Anki-style)"""
         now = datetime.now(self.melbourne_tz)
+        today = now.date()
+        last_day = today + timedelta(days=days_ahead)
+
+        # Bucket start days; each bucket runs until the next start (or the end of the horizon)
+        if group_by == "day":
+            starts = [today + timedelta(days=i) for i in range(days_ahead + 1)]
+        elif group_by == "week":
+            starts = [today + timedelta(days=i) for i in range(0, days_ahead + 1, 7)]
+        else:
+            starts = [today]
+            month = today.replace(day=1)
+            while True:
+                month = (month + timedelta(days=32)).replace(day=1)
+                if month > last_day:
+                    break
+                starts.append(month)
+        ends = starts[1:] + [last_day + timedelta(days=1)]
+        boundaries = [self._local_midnight(d) for d in starts + ends[-1:]]
+        with self._lock:
+            counts = self._due_index.count_between(boundaries)
+
+        if group_by != "day":
+            return [{
+                "period_offset": i,
+                "start": start.isoformat(),
+                "end": (end - timedelta(days=1)).isoformat(),
+                "label": start.strftime("%B %Y") if group_by == "month" else
+                         f"{start.strftime('%b %d')} - {(end - timedelta(days=1)).strftime('%b %d')}",
+                "count": count
+            } for i, (start, end, count) in enumerate(zip(starts, ends, counts))]
+
         daily_counts = []
-        
-        for day_offset in range(days_ahead + 1):
+        for day_offset, count in enumerate(counts):
             target_date = now + timedelta(days=day_offset)
-            start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_day = start_of_day + timedelta(days=1)
-            
-            count = 0
-            for word_data in self.vocabulary.values():
-                next_review = datetime.fromisoformat(word_data["next_review"])
-                # Make naive datetime timezone-aware for comparison
-                if next_review.tzinfo is None:
-                    next_review = self.melbourne_tz.localize(next_review)
-                if start_of_day <= next_review < end_of_day:
-                    count += 1
             
             # Format the date for display
             if day_offset == 0:
@@ -288,42 +882,38 @@ class SpacedRepetition:
     
     def get_next_review_info(self, word_id: str) -> Dict:
         """Get detailed information about when a word will be reviewed next"""
-        if word_id not in self.vocabulary:
-            raise ValueError("Word not found")
-        
-        word_data = self.vocabulary[word_id]
-        now = datetime.now(self.melbourne_tz)
-        next_review = datetime.fromisoformat(word_data["next_review"])
-        # Make naive datetime timezone-aware for comparison
-        if next_review.tzinfo is None:
-            next_review = self.melbourne_tz.localize(next_review)
-        time_until = next_review - now
-        
-        return {
-            "word": word_data["word"],
-            "translation": word_data["translation"],
-            "next_review": word_data["next_review"],
-            "human_readable": self._format_time_interval(time_until),
-            "time_until_seconds": int(time_until.total_seconds()),  # Convert to integer seconds
-            "interval": word_data["interval"],
-            "ease_factor": word_data["ease_factor"],
-            "review_count": word_data["review_count"],
-            "correct_count": word_data["correct_count"],
-            "incorrect_count": word_data["incorrect_count"],
-            "is_overdue": time_until.total_seconds() < 0
-        }
+        with self._lock:
+            if word_id not in self.vocabulary:
+                raise ValueError("Word not found")
+
+            card = self.vocabulary[word_id]
+            _, now_us = self._now()
+            time_until = timedelta(microseconds=card.next_review_us - now_us)
+
+            return {
+                "word": card.word,
+                "translation": card.translation,
+                "next_review": _from_stamp(card.next_review_us, card.next_review_zone, self.melbourne_tz),
+                "human_readable": self._format_time_interval(time_until),
+                "time_until_seconds": int(time_until.total_seconds()),  # Convert to integer seconds
+                "interval": card.interval,
+                "ease_factor": card.ease_factor,
+                "review_count": card.review_count,
+                "correct_count": card.correct_count,
+                "incorrect_count": card.incorrect_count,
+                "is_overdue": time_until.total_seconds() < 0
+            }
     
     def get_review_preview(self, word_id: str) -> Dict:
         """Get preview of what each review option will do"""
-        if word_id not in self.vocabulary:
-            raise ValueError("Word not found")
-        
-        word_data = self.vocabulary.copy()
+        with self._lock:
+            if word_id not in self.vocabulary:
+                raise ValueError("Word not found")
+            card = self.vocabulary[word_id]
+            # Scheduling state to simulate the review on
+            preview_data = {"interval": card.interval, "ease_factor": card.ease_factor}
         now = datetime.now(self.melbourne_tz)
         
-        # Create a copy of the word data to simulate the review
-        preview_data = word_data[word_id].copy()
-        
         previews = {}
         
         # Test each quality rating (0-5)
@@ -397,15 +987,10 @@ class SpacedRepetition:
     
 
     
-    def search_words(self, query: str) -> List[Dict]:
-        """Search words by word, translation, or notes"""
-        query = query.lower()
-        results = []
-        
-        for word_data in self.vocabulary.values():
-            if (query in word_data["word"].lower() or 
-                query in word_data["translation"].lower() or
-                query in word_data["notes"].lower()):
-                results.append(word_data)
-        
-        return results
+    def search_words(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Search words by word, translation, or notes (accent-insensitive, best matches first)"""
+        with self._lock:
+            return [
+                self.vocabulary[word_id].to_dict(self.melbourne_tz)
+                for word_id in self._search_index.search(query, limit)
+            ]
@@ -0,0 +1,444 @@
+"""Storage backends for the spaced repetition vocabulary.
+
+Every backend exposes the same small interface used by SpacedRepetition:
+
+    load()                       -> {word_id: word_data}
+    save_all(vocabulary)         rewrite the whole deck
+    put(vocabulary, word_id)     persist one added/updated card
+    put_many(vocabulary, ids)    persist several cards in one write
+    delete(vocabulary, word_id)  persist one removal
+    close()
+
+`vocabulary` is any mapping of word_id -> card dict. Backends whose writes
+always rewrite the whole deck set `whole_deck_writes` so bulk callers can
+batch accordingly.
+
+Each backend also has an `observer` attribute (None by default). When set, it
+is called as observer(op, seconds, bytes_written) after every write, with
+bytes_written None where the backend can't tell (SQLite).
+
+"journal" shares vocabulary.json with the JSON backend as its snapshot, so an
+existing deck can switch between the two without migrating.
+
+Usage (one-shot migration of the JSON deck into SQLite):
+
+    python storage.py migrate vocabulary.json vocabulary.db
+"""
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import pytz
+
+# Field order of a card, as returned by the API
+CARD_FIELDS = (
+    "id", "word", "translation", "example", "word_type", "notes",
+    "created", "last_reviewed", "next_review",
+    "interval", "ease_factor", "review_count", "correct_count", "incorrect_count",
+)
+
+DEFAULT_PATHS = {
+    "json": "vocabulary.json",
+    "sqlite": "vocabulary.db",
+    "journal": "vocabulary.json",
+}
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+def _write_snapshot(path: str, vocabulary: Dict) -> int:
+    """Write a JSON deck to a temp file and atomically rename it over `path`; returns its size"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+        size = os.fstat(f.fileno()).st_size
+    os.replace(tmp_path, path)
+    return size
+
+class JSONStorage:
+    """Whole deck in a single JSON file (the original format)"""
+
+    # Every write rewrites the file, so callers should batch generously
+    whole_deck_writes = True
+    observer = None
+
+    def __init__(self, path: str = DEFAULT_PATHS["json"]):
+        self.path = path
+
+    def load(self) -> Dict:
+        """Load vocabulary from JSON file"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            return {}
+
+    def save_all(self, vocabulary: Dict):
+        """Save vocabulary to JSON file"""
+        started = time.perf_counter()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            # json.dump only accepts real dicts, not other mappings
+            json.dump(dict(vocabulary), f, ensure_ascii=False, indent=2)
+            f.flush()
+            size = os.fstat(f.fileno()).st_size
+        if self.observer is not None:
+            self.observer("save_all", time.perf_counter() - started, size)
+
+    # The JSON format has no per-card records, so single-card changes rewrite the file
+    def put(self, vocabulary: Dict, word_id: str):
+        self.save_all(vocabulary)
+
+    def put_many(self, vocabulary: Dict, word_ids: List[str]):
+        self.save_all(vocabulary)
+
+    def delete(self, vocabulary: Dict, word_id: str):
+        self.save_all(vocabulary)
+
+    def close(self):
+        pass
+
+class SQLiteStorage:
+    """One row per card in an SQLite database (WAL mode)"""
+
+    whole_deck_writes = False
+    observer = None
+
+    def __init__(self, path: str = DEFAULT_PATHS["sqlite"], tz=None):
+        self.path = path
+        # Timezone assumed for naive timestamps when filling next_review_ts
+        self.tz = tz or pytz.timezone('Australia/Melbourne')
+        # Flask serves requests from several threads; serialize access to the connection
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cards (
+                    id TEXT PRIMARY KEY,
+                    word TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    example TEXT NOT NULL DEFAULT '',
+                    word_type TEXT NOT NULL DEFAULT '',
+                    notes TEXT NOT NULL DEFAULT '',
+                    created TEXT,
+                    last_reviewed TEXT,
+                    next_review TEXT NOT NULL,
+                    next_review_ts REAL NOT NULL,
+                    interval INTEGER NOT NULL DEFAULT 0,
+                    ease_factor REAL NOT NULL DEFAULT 2.5,
+                    review_count INTEGER NOT NULL DEFAULT 0,
+                    correct_count INTEGER NOT NULL DEFAULT 0,
+                    incorrect_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_next_review ON cards(next_review_ts)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_interval ON cards(interval)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_ease_factor ON cards(ease_factor)")
+
+        columns = CARD_FIELDS + ("next_review_ts",)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+        # Upsert instead of INSERT OR REPLACE so a card keeps its rowid (and load order)
+        self._upsert_sql = (
+            f"INSERT INTO cards ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+
+    def _epoch(self, iso: str) -> float:
+        review_time = datetime.fromisoformat(iso)
+        if review_time.tzinfo is None:
+            review_time = self.tz.localize(review_time)
+        return review_time.timestamp()
+
+    def _row(self, word_data: Dict) -> tuple:
+        return tuple(word_data.get(f) for f in CARD_FIELDS) + (self._epoch(word_data["next_review"]),)
+
+    def _observe(self, op: str, started: float):
+        if self.observer is not None:
+            self.observer(op, time.perf_counter() - started, None)
+
+    def load(self) -> Dict:
+        """Load every card, in insertion order"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(CARD_FIELDS)} FROM cards ORDER BY rowid").fetchall()
+        return {row[0]: dict(zip(CARD_FIELDS, row)) for row in rows}
+
+    def save_all(self, vocabulary: Dict):
+        """Replace the stored deck with `vocabulary`"""
+        started = time.perf_counter()
+        rows = [self._row(word_data) for word_data in vocabulary.values()]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards")
+            self._conn.executemany(self._upsert_sql, rows)
+        self._observe("save_all", started)
+
+    def put(self, vocabulary: Dict, word_id: str):
+        """Insert or update a single card row"""
+        started = time.perf_counter()
+        row = self._row(vocabulary[word_id])
+        with self._lock, self._conn:
+            self._conn.execute(self._upsert_sql, row)
+        self._observe("put", started)
+
+    def put_many(self, vocabulary: Dict, word_ids: List[str]):
+        """Upsert several card rows in one transaction"""
+        started = time.perf_counter()
+        rows = [self._row(vocabulary[word_id]) for word_id in word_ids]
+        with self._lock, self._conn:
+            self._conn.executemany(self._upsert_sql, rows)
+        self._observe("put_many", started)
+
+    def delete(self, vocabulary: Dict, word_id: str):
+        """Delete a single card row"""
+        started = time.perf_counter()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards WHERE id = ?", (word_id,))
+        self._observe("delete", started)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JournalStorage(JSONStorage):
+    """JSON snapshot plus an append-only journal of card changes.
+
+    Each put/delete appends one JSON line to `<path>.journal`. A background
+    thread, shared by every open journal, folds the journal into a fresh
+    snapshot once it reaches `compact_every` records or `compact_interval`
+    seconds have passed.
+
+    fsync policy: "always" syncs every record, "interval" at most every
+    `fsync_interval` seconds, "never" leaves it to the OS.
+    """
+
+    whole_deck_writes = False
+
+    def __init__(self, path: str = DEFAULT_PATHS["journal"], fsync: str = "interval",
+                 fsync_interval: float = 1.0, compact_every: int = 1000, compact_interval: float = 300.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        super().__init__(path)
+        self.journal_path = f"{path}.journal"
+        # Journal being folded into the snapshot; new records go to a fresh journal meanwhile
+        self.compacting_path = f"{path}.journal.1"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+
+        self._lock = threading.Lock()  # guards the journal file handle
+        self._compact_lock = threading.Lock()  # one snapshot writer at a time
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._records = 0
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+        self._last_compaction = time.monotonic()
+        self._closed = False
+
+        _COMPACTOR.add(self)
+        atexit.register(self.close)
+
+    def _replay(self, vocabulary: Dict, journal_path: str) -> int:
+        """Apply a journal file to `vocabulary`; returns the number of records"""
+        count = 0
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash mid-append
+                    if record["op"] == "reset":
+                        vocabulary.clear()
+                    elif record["op"] == "put":
+                        vocabulary[record["card"]["id"]] = record["card"]
+                    elif record["op"] == "del":
+                        vocabulary.pop(record["id"], None)
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    def load(self) -> Dict:
+        """Load the snapshot and replay any journal records on top of it"""
+        vocabulary = super().load()
+        self._replay(vocabulary, self.compacting_path)
+        with self._lock:
+            self._records = self._replay(vocabulary, self.journal_path)
+        return vocabulary
+
+    def _append(self, *records: Dict):
+        started = time.perf_counter()
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + "\n" for r in records)
+        with self._lock:
+            self._journal.write(lines)
+            self._journal.flush()
+            self._records += len(records)
+            self._dirty = True
+            if self.fsync == "always" or (
+                self.fsync == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval
+            ):
+                self._sync()
+        if self.observer is not None:
+            self.observer("append", time.perf_counter() - started, len(lines.encode('utf-8')))
+
+    def _sync(self):
+        # Caller holds self._lock
+        os.fsync(self._journal.fileno())
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def put(self, vocabulary: Dict, word_id: str):
+        """Append one card record"""
+        self._append({"op": "put", "card": vocabulary[word_id]})
+
+    def put_many(self, vocabulary: Dict, word_ids: List[str]):
+        """Append several card records with a single write (and at most one fsync)"""
+        self._append(*({"op": "put", "card": vocabulary[word_id]} for word_id in word_ids))
+
+    def delete(self, vocabulary: Dict, word_id: str):
+        """Append one removal record"""
+        self._append({"op": "del", "id": word_id})
+
+    def save_all(self, vocabulary: Dict):
+        """Journal the whole deck behind a reset marker, then fold it into the snapshot"""
+        # Going through the journal keeps every crash point recoverable by replay
+        started = time.perf_counter()
+        lines = [json.dumps({"op": "reset"})]
+        lines += [json.dumps({"op": "put", "card": card}, ensure_ascii=False, separators=(',', ':'))
+                  for card in vocabulary.values()]
+        with self._lock:
+            self._journal.write("\n".join(lines) + "\n")
+            self._journal.flush()
+            self._records += len(lines)
+            self._sync()
+        if self.observer is not None:
+            self.observer("save_all", time.perf_counter() - started, sum(len(line.encode('utf-8')) + 1 for line in lines))
+        self.compact()
+
+    def compact(self):
+        """Fold the journal into a new snapshot (atomic rename)"""
+        with self._compact_lock:
+            with self._lock:
+                if self._records and not os.path.exists(self.compacting_path):
+                    self._sync()
+                    self._journal.close()
+                    os.replace(self.journal_path, self.compacting_path)
+                    self._journal = open(self.journal_path, 'a', encoding='utf-8')
+                    self._records = 0
+            if not os.path.exists(self.compacting_path):
+                return
+            started = time.perf_counter()
+            # Appends carry on into the new journal while the snapshot is rebuilt
+            vocabulary = super().load()
+            self._replay(vocabulary, self.compacting_path)
+            size = _write_snapshot(self.path, vocabulary)
+            os.remove(self.compacting_path)
+            self._last_compaction = time.monotonic()
+        if self.observer is not None:
+            self.observer("compact", time.perf_counter() - started, size)
+
+    def maintain(self):
+        """Periodic work, run by the shared compactor: sync a dirty journal, compact when due"""
+        with self._lock:
+            if self._closed:
+                return
+            if self._dirty and self.fsync == "interval":
+                self._sync()
+            records = self._records
+        if records >= self.compact_every or (
+            records and time.monotonic() - self._last_compaction >= self.compact_interval
+        ):
+            self.compact()
+
+    def close(self):
+        """Leave the compactor, fold the journal and close the file"""
+        if self._closed:
+            return
+        _COMPACTOR.discard(self)
+        atexit.unregister(self.close)  # otherwise every evicted deck stays referenced until exit
+        self.compact()
+        with self._lock:
+            self._closed = True
+            self._journal.close()
+
+class _Compactor:
+    """One daemon thread that runs maintain() on every open journal, however many decks are loaded"""
+
+    def __init__(self):
+        self._journals: List[JournalStorage] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, journal: JournalStorage):
+        with self._lock:
+            self._journals.append(journal)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="journal-compactor", daemon=True)
+                self._thread.start()
+
+    def discard(self, journal: JournalStorage):
+        with self._lock:
+            if journal in self._journals:
+                self._journals.remove(journal)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                tick = min((min(j.fsync_interval, 5.0) for j in self._journals), default=5.0)
+            time.sleep(tick)
+            with self._lock:
+                journals = list(self._journals)
+            for journal in journals:
+                try:
+                    journal.maintain()
+                except Exception as e:
+                    print(f"Journal compaction failed ({journal.path}): {e}")
+
+_COMPACTOR = _Compactor()
+
+BACKENDS = {
+    "json": JSONStorage,
+    "sqlite": SQLiteStorage,
+    "journal": JournalStorage,
+}
+
+def open_storage(kind: str = "json", path: Optional[str] = None, **options):
+    """Create a storage backend by name ("json", "sqlite" or "journal")"""
+    kind = (kind or "json").lower()
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {kind}")
+    return BACKENDS[kind](path or DEFAULT_PATHS[kind], **options)
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """Copy every card from a JSON deck into an SQLite deck; returns the card count"""
+    vocabulary = JSONStorage(json_path).load()
+    target = SQLiteStorage(db_path)
+    try:
+        target.save_all(vocabulary)
+    finally:
+        target.close()
+    return len(vocabulary)
+
+def main():
+    parser = argparse.ArgumentParser(description="Vocabulary storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Copy a JSON deck into an SQLite database")
+    migrate.add_argument("json_path", nargs="?", default=DEFAULT_PATHS["json"])
+    migrate.add_argument("db_path", nargs="?", default=DEFAULT_PATHS["sqlite"])
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        count = migrate_json_to_sqlite(args.json_path, args.db_path)
+        print(f"Migrated {count} words from {args.json_path} to {args.db_path}")
+
+if __name__ == "__main__":
+    main()
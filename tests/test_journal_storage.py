@@ -0,0 +1,31 @@
+"""Journal decks that are opened and closed over and over must not pile up threads or exit hooks."""
+import gc
+import os
+import sys
+import threading
+import weakref
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import JournalStorage  # noqa: E402
+
+def test_closed_journals_are_released(tmp_path):
+    threads_before = threading.active_count()
+    refs = []
+    for i in range(20):
+        storage = JournalStorage(str(tmp_path / f"deck{i}.json"))
+        vocabulary = storage.load()
+        vocabulary["1"] = {"id": "1", "word": "casa"}
+        storage.put(vocabulary, "1")
+        # At most the one shared compactor thread, however many journals are open
+        assert threading.active_count() <= threads_before + 1
+        storage.close()
+        refs.append(weakref.ref(storage))
+        del storage
+    gc.collect()
+    assert all(ref() is None for ref in refs)
+    reopened = JournalStorage(str(tmp_path / "deck0.json"))
+    try:
+        assert reopened.load() == {"1": {"id": "1", "word": "casa"}}
+    finally:
+        reopened.close()
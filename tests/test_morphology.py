@@ -0,0 +1,33 @@
+"""Inflections that count as known, and look-alike words that must not."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from morphology import expand  # noqa: E402
+
+def test_nouns_get_only_their_plural():
+    assert expand("casa", "noun") == {"casa", "case"}
+    assert expand("amico", "noun") == {"amico", "amici"}
+    assert expand("lago", "noun") == {"lago", "laghi"}
+
+def test_adjectives_get_gender_number_and_superlative():
+    assert {"bianca", "bianchi", "bianche", "bianchissimo"} <= expand("bianco", "adjective")
+    assert {"simpatici", "simpatiche"} <= expand("simpatico", "adjective")
+
+def test_short_words_are_not_inflected():
+    assert expand("che") == {"che"}
+    assert expand("con", "noun") == {"con"}
+
+def test_isc_verbs_skip_the_plain_present():
+    forms = expand("finire", "verb")
+    assert {"finisco", "finisce", "finiscono", "finiamo"} <= forms
+    assert not forms & {"fino", "fine", "fina"}
+    assert {"dormo", "dorme", "dormono"} <= expand("dormire", "verb")
+    assert "dormisco" not in expand("dormire", "verb")
+
+def test_untyped_entries_get_one_kind_of_expansion():
+    assert expand("sono") == {"sono"}
+    assert not expand("finire") & {"finira", "finiri"}
+    assert "amichi" not in expand("amico")
+    assert "parliamo" in expand("parlare")
@@ -0,0 +1,40 @@
+"""Loading and importing cards: dedupe and stored fields survive unchanged."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from spaced_repetition import SpacedRepetition  # noqa: E402
+from test_spaced_repetition_threads import MemoryStorage  # noqa: E402
+
+def test_accented_pairs_are_not_duplicates():
+    sr = SpacedRepetition(storage=MemoryStorage({}))
+    rows = [{"word": w, "translation": t} for w, t in
+            [("papa", "pope"), ("papà", "dad"), ("e", "and"), ("è", "is"), ("da", "from"), ("dà", "gives"),
+             ("pero", "pear tree"), ("però", "but")]]
+    summary = sr.add_words(rows)
+    assert summary["added"] == 8 and summary["duplicates"] == 0
+    assert sr.find_word("papà") != sr.find_word("papa")
+
+def test_case_and_whitespace_still_duplicate():
+    sr = SpacedRepetition(storage=MemoryStorage({}))
+    summary = sr.add_words([{"word": "Papà", "translation": "dad"}, {"word": " papà ", "translation": "dad"},
+                            {"word": "PAPÀ", "translation": "dad"}])
+    assert summary["added"] == 1 and summary["duplicates"] == 2
+
+def test_stored_timestamps_round_trip_exactly():
+    cards = {
+        "1": {"id": "1", "word": "gap", "translation": "t", "example": "", "word_type": "", "notes": "",
+              "created": "2024-10-06T02:30:00", "last_reviewed": "2024-01-02T03:04:05Z",
+              "next_review": "2024-05-06T12:30:00.123456+10:00", "interval": 1, "ease_factor": 2.5,
+              "review_count": 1, "correct_count": 1, "incorrect_count": 0},
+    }
+    sr = SpacedRepetition(storage=MemoryStorage(cards))
+    assert sr.vocabulary["1"].to_dict(sr.melbourne_tz) == cards["1"]
+
+def test_cards_missing_timestamps_still_load():
+    sr = SpacedRepetition(storage=MemoryStorage({"1": {"id": "1", "word": "casa", "translation": "house"}}))
+    card = sr.vocabulary["1"].to_dict(sr.melbourne_tz)
+    assert card["created"] is None and card["last_reviewed"] is None
+    assert sr.get_due_words()[0]["id"] == "1"
+    assert card["interval"] == 0 and card["ease_factor"] == 2.5 and card["review_count"] == 0
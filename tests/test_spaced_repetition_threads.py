@@ -0,0 +1,134 @@
+"""Concurrent requests against one deck must leave its derived indexes consistent."""
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from spaced_repetition import DeckStats, SpacedRepetition  # noqa: E402
+
+DECK_SIZE = 20_000
+THREADS = 8
+REVIEWS_PER_THREAD = 3_000
+
+class MemoryStorage:
+    """Storage backend that keeps nothing, so the test measures only the engine"""
+
+    whole_deck_writes = False
+    path = ":memory:"
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def load(self):
+        return dict(self.cards)
+
+    def save_all(self, vocabulary):
+        pass
+
+    def put(self, vocabulary, word_id):
+        pass
+
+    def put_many(self, vocabulary, word_ids):
+        pass
+
+    def delete(self, vocabulary, word_id):
+        pass
+
+    def close(self):
+        pass
+
+def make_deck(size: int) -> SpacedRepetition:
+    now = datetime.now(pytz.timezone("Australia/Melbourne"))
+    rng = random.Random(3)
+    cards = {}
+    for i in range(size):
+        word_id = str(1_700_000_000_000 + i)
+        due = now + timedelta(days=rng.uniform(-30, 60))
+        cards[word_id] = {
+            "id": word_id, "word": f"parola{i}", "translation": f"word{i}", "example": "", "word_type": "noun",
+            "notes": "", "created": (now - timedelta(days=90)).isoformat(), "last_reviewed": None,
+            "next_review": due.isoformat(), "interval": 1, "ease_factor": 2.5,
+            "review_count": 0, "correct_count": 0, "incorrect_count": 0,
+        }
+    return SpacedRepetition(storage=MemoryStorage(cards))
+
+def hammer(sr: SpacedRepetition, work):
+    """Run `work(sr, rng)` on THREADS threads at a tiny switch interval to force interleaving"""
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    errors = []
+
+    def run(seed):
+        rng = random.Random(seed)
+        try:
+            work(sr, rng)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=run, args=(seed,)) for seed in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(old_interval)
+    assert not errors, errors
+
+def test_concurrent_reviews_keep_due_index_consistent():
+    sr = make_deck(DECK_SIZE)
+    ids = list(sr.vocabulary)
+
+    def work(sr, rng):
+        # A small pool of hot cards makes concurrent reviews of the same card likely
+        hot = rng.sample(ids, 50)
+        for _ in range(REVIEWS_PER_THREAD):
+            sr.review_word(rng.choice(hot), rng.randint(0, 5))
+            if rng.random() < 0.05:
+                sr.get_stats()
+
+    hammer(sr, work)
+
+    index = sr._due_index
+    assert len(index) == len(sr.vocabulary) == DECK_SIZE
+    assert list(index._keys) == sorted((epoch, word_id) for word_id, epoch in index._epochs.items())
+    assert all(index._epochs[word_id] == card.next_review_us for word_id, card in sr.vocabulary.items())
+
+def test_concurrent_reviews_keep_stats_totals():
+    sr = make_deck(DECK_SIZE)
+    ids = list(sr.vocabulary)
+
+    def work(sr, rng):
+        hot = rng.sample(ids, 50)
+        for _ in range(REVIEWS_PER_THREAD):
+            sr.review_word(rng.choice(hot), rng.randint(0, 5))
+
+    hammer(sr, work)
+
+    cards = list(sr.vocabulary.values())
+    assert sr._stats.total_reviews == sum(card.review_count for card in cards) == THREADS * REVIEWS_PER_THREAD
+    assert sr._stats.total_correct == sum(card.correct_count for card in cards)
+    fresh = DeckStats(cards)
+    assert sr._stats.histograms() == fresh.histograms()
+
+def test_concurrent_adds_and_deletes_keep_indexes_consistent():
+    sr = make_deck(2_000)
+
+    def work(sr, rng):
+        for i in range(300):
+            word_data = sr.add_word(f"nuova{rng.random()}", "new")
+            sr.search_words("nuova", 5)
+            if i % 2:
+                sr.delete_word(word_data["id"])
+
+    hammer(sr, work)
+
+    expected = 2_000 + THREADS * 150
+    assert len(sr.vocabulary) == len(sr._due_index) == len(sr._id_order) == expected
+    assert [word_id for _, word_id in sr._id_order] == sorted(sr.vocabulary, key=lambda w: (len(w), w))
+    assert list(sr._due_index._keys) == sorted((e, w) for w, e in sr._due_index._epochs.items())
@@ -0,0 +1,28 @@
+"""Cache keys ignore case and spacing but never accents."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from translation_cache import MISS, TranslationCache, cache_key  # noqa: E402
+
+def test_accented_and_plain_words_are_cached_apart(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.db"))
+    try:
+        _check_accents(cache)
+    finally:
+        cache.close()
+
+def _check_accents(cache):
+    cache.put("google", "papà", ["dad"])
+    cache.put("google", "e", ["and"])
+    assert cache.get("google", "papa") is MISS
+    assert cache.get("google", "è") is MISS
+    assert cache.get("google", " Papà ") == ["dad"]
+    cache.put("google", "papa", ["pope"])
+    assert cache.get("google", "papà") == ["dad"]
+    assert cache.get("google", "papa") == ["pope"]
+
+def test_context_keeps_accents():
+    assert cache_key("ai", "papa", "perché") != cache_key("ai", "papa", "perche")
+    assert cache_key("ai", "papa", "  Perché   no ") == cache_key("ai", "papa", "perché no")
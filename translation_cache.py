@@ -0,0 +1,124 @@
+"""Disk-backed translation cache shared by every worker process.
+
+Entries live in a small SQLite database (WAL mode, so gunicorn workers can
+read and write it concurrently) keyed by provider, normalised word and
+context. Answers are kept for `ttl` seconds; failures are cached
+too, as None, for the much shorter `negative_ttl` so a word Google can't
+translate isn't re-requested on every click. The table is held to roughly
+`max_entries` rows by evicting the least recently used.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict
+
+from search_index import normalize
+
+MISS = object()  # returned by get() when there is no usable entry
+
+# Reads only refresh last_used when it is older than this, to keep hits cheap
+_TOUCH_AFTER = 60.0
+
+# Stored keys start with this; bumped when cache_key changes so older rows (which folded
+# accents away, filing "papà" under "papa") are never read again and age out through LRU
+_KEY_VERSION = "2"
+
+def cache_key(provider: str, word: str, context: str = "") -> str:
+    """provider|normalised word|normalised context (case and spacing ignored, accents kept: papa ≠ papà)"""
+    return f"{provider}|{normalize(word)}|{normalize(context)}"
+
+class TranslationCache:
+    """SQLite key-value cache with TTL, negative caching and LRU eviction"""
+
+    def __init__(self, path: str = "translations.db", ttl: float = 30 * 86400, negative_ttl: float = 600,
+                 max_entries: int = 50000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counters = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "puts": 0, "evictions": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations(last_used)")
+        self._conn.commit()
+
+    def get(self, provider: str, word: str, context: str = "") -> Any:
+        """The cached answer (None for a cached failure), or MISS"""
+        key = f"{_KEY_VERSION}|{cache_key(provider, word, context)}"
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, last_used FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return MISS
+            value, expires_at, last_used = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                self._conn.commit()
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return MISS
+            if now - last_used > _TOUCH_AFTER:
+                self._conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            if value is None:
+                self.counters["negative_hits"] += 1
+                return None
+            self.counters["hits"] += 1
+            return json.loads(value)
+
+    def put(self, provider: str, word: str, value: Any, context: str = ""):
+        """Cache an answer; None records a failure for negative_ttl seconds"""
+        now = time.time()
+        ttl = self.negative_ttl if value is None else self.ttl
+        encoded = None if value is None else json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO translations (key, value, expires_at, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+                "last_used = excluded.last_used",
+                (f"{_KEY_VERSION}|{cache_key(provider, word, context)}", encoded, now + ttl, now),
+            )
+            self.counters["puts"] += 1
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used beyond max_entries"""
+        cur = self._conn.execute("DELETE FROM translations WHERE expires_at <= ?", (now,))
+        evicted = cur.rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        if count > self.max_entries:
+            cur = self._conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            evicted += cur.rowcount
+        self.counters["evictions"] += evicted
+
+    def stats(self) -> Dict:
+        """Counters for this process plus the shared table size"""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["negative_hits"] + counters["misses"]
+        counters["entries"] = entries
+        counters["hit_ratio"] = round((counters["hits"] + counters["negative_hits"]) / lookups, 4) if lookups else 0.0
+        return counters
+
+    def close(self):
+        with self._lock:
+            self._conn.close()